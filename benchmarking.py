@@ -1,5 +1,6 @@
 # benchmarking.py
 
+from utils.openai_utils import run_async
 from utils.logger import setup_logger
 from system_augmentation import SystemAugmentor
 
@@ -30,19 +31,19 @@ class Benchmarking:
             return {}
 
     def _evaluate_idea_quality(self):
-        return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_idea_quality()
+        return self._fallback_benchmark() if not self.system_augmentor else run_async(self.system_augmentor._benchmark_idea_quality())
 
     def _evaluate_idea_evaluation(self):
         return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_idea_evaluation()
 
     def _evaluate_experiment_design(self):
-        return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_experiment_design()
+        return self._fallback_benchmark() if not self.system_augmentor else run_async(self.system_augmentor._benchmark_experiment_design())
 
     def _evaluate_experiment_execution(self):
         return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_experiment_execution()
 
     def _evaluate_research_application(self):
-        return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_research_application()
+        return self._fallback_benchmark() if not self.system_augmentor else run_async(self.system_augmentor._benchmark_research_application())
 
     def _evaluate_system_reliability(self):
         return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_system_reliability()
@@ -51,7 +52,7 @@ class Benchmarking:
         return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_coding_task()
 
     def _evaluate_report_quality(self):
-        return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_report_quality()
+        return self._fallback_benchmark() if not self.system_augmentor else run_async(self.system_augmentor._benchmark_report_quality())
 
     def _evaluate_log_error_checking(self):
         return self._fallback_benchmark() if not self.system_augmentor else self.system_augmentor._benchmark_log_error_checking()
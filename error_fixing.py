@@ -2,6 +2,7 @@
 
 import os
 import json  # Added import for json module
+import orjson
 from utils.logger import setup_logger
 from utils.openai_utils import create_completion
 from utils.config import initialize_openai
@@ -27,13 +28,13 @@ class ErrorFixer:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI research assistant. Suggest fixes for the given errors and warnings."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens,
                 temperature=0.7,
             )
             
-            self.logger.info(f"Raw API response: {response}")
+            self.logger.info("Raw API response: %s", response)
             
             fixes = json.loads(response)
             
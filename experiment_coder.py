@@ -1,8 +1,9 @@
 # experiment_coder.py
 
 import json
+import orjson
 from utils.logger import setup_logger
-from utils.openai_utils import create_completion
+from utils.openai_utils import create_completion, response_content
 from utils.config import initialize_openai
 from utils.json_utils import parse_llm_response  # Change this line
 from experiment_execution import ExperimentExecutor
@@ -11,6 +12,13 @@ import re
 import sys
 import logging
 
+# Fenced code blocks in a model response
+_CODE_BLOCK_RE = re.compile(r'```(?:python)?\n(.*?)```', re.DOTALL)
+
+def _content(response):
+    """Reply text of a raw API response, or None for anything else."""
+    return response_content(response) if hasattr(response, 'choices') else None
+
 class ExperimentCoder:
     def __init__(self, model_name, max_tokens):
         self.model_name = model_name
@@ -44,7 +52,7 @@ class ExperimentCoder:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI research assistant specializing in coding experiments."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens,
                 temperature=0.7,
@@ -53,14 +61,14 @@ class ExperimentCoder:
             self.console_logger.info("Received response from LLM. Processing...")
             
             # Log the full response from the LLM
-            self.logger.debug(f"Full LLM response:\n{response}")
+            self.logger.debug("Full LLM response:\n%s", response)
             
             # Extract the code from the response
             code = self.extract_code_from_response(response)
             
             if code:
                 # Log the extracted code
-                self.logger.debug(f"Extracted code:\n{code}")
+                self.logger.debug("Extracted code:\n%s", code)
                 
                 # Check if the code is complete
                 if self.is_code_complete(code):
@@ -106,12 +114,8 @@ class ExperimentCoder:
     def parse_response(self, response):
         # Extract the Python code from the LLM response
         # This method may need to be adjusted based on the actual response format
-        if isinstance(response, str):
-            return response.strip()
-        elif hasattr(response, 'choices') and response.choices:
-            return response.choices[0].message.content.strip()
-        else:
-            return None
+        content = response if isinstance(response, str) else _content(response)
+        return content.strip() if content is not None else None
 
     def extract_requirements(self, code):
         # Extract required libraries from the import statements
@@ -164,7 +168,7 @@ class ExperimentCoder:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI research assistant specializing in coding experiments."},
-                    {"role": "user", "content": json.dumps(completion_prompt)}
+                    {"role": "user", "content": orjson.dumps(completion_prompt).decode()}
                 ],
                 max_tokens=self.max_tokens,
                 temperature=0.7,
@@ -188,23 +192,15 @@ class ExperimentCoder:
 
     def extract_code_from_response(self, response):
         self.console_logger.info("Extracting code from LLM response...")
-        if isinstance(response, str):
-            # Try to extract code from markdown code blocks
-            code_blocks = re.findall(r'```(?:python)?\n(.*?)```', response, re.DOTALL)
-            if code_blocks:
-                return '\n'.join(code_blocks)
-            # If no code blocks found, return the entire response
-            return response.strip()
-        elif hasattr(response, 'choices') and response.choices:
-            content = response.choices[0].message.content.strip()
-            # Try to extract code from markdown code blocks
-            code_blocks = re.findall(r'```(?:python)?\n(.*?)```', content, re.DOTALL)
-            if code_blocks:
-                return '\n'.join(code_blocks)
-            # If no code blocks found, return the entire content
-            return content
-        else:
+        content = response if isinstance(response, str) else _content(response)
+        if content is None:
             return None
+        # Try to extract code from markdown code blocks
+        code_blocks = _CODE_BLOCK_RE.findall(content)
+        if code_blocks:
+            return '\n'.join(code_blocks)
+        # If no code blocks found, return the entire content; only this needs stripping
+        return content.strip()
 
     def get_incompleteness_reason(self, code):
         lines = code.strip().split('\n')
@@ -11,6 +11,7 @@ from utils.logger import setup_logger
 from utils.openai_utils import create_completion
 from utils.config import initialize_openai
 import json
+import orjson
 from utils.json_utils import parse_llm_response, extract_json_from_text
 import textwrap
 from pprint import pformat
@@ -18,6 +19,15 @@ import traceback
 import logging
 from abc import ABC, abstractmethod
 
+# Patterns for parsing plain-text experiment plans, compiled once
+_STEP_RE = re.compile(r'Step (\d+):(.*?)(?=Step \d+:|$)', re.DOTALL)
+_ACTION_RE = re.compile(r'Action: (\w+)')
+_CODE_RE = re.compile(r'Code:(.*?)(?=\n\w+:|$)', re.DOTALL)
+_PROMPT_RE = re.compile(r'Prompt:(.*?)(?=\n\w+:|$)', re.DOTALL)
+_URL_RE = re.compile(r'URL: (.*?)(?=\n|$)')
+_METHOD_RE = re.compile(r'Method: (GET|POST|PUT|DELETE)')
+_TASK_RE = re.compile(r'Task:(.*?)(?=\n\w+:|$)', re.DOTALL)
+
 class ActionStrategy(ABC):
     @abstractmethod
     def execute(self, step, executor):
@@ -58,12 +68,12 @@ class ExperimentDesigner:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI research assistant. Design an experiment based on the given idea."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens
             )
             
-            self.logger.debug(f"Raw LLM response: {response}")
+            self.logger.debug("Raw LLM response: %s", response)
             
             # Try to parse the response as JSON
             experiment_plan = parse_llm_response(response)
@@ -88,7 +98,7 @@ class ExperimentDesigner:
         
         except json.JSONDecodeError as e:
             self.logger.error(f"Failed to parse response as JSON: {e}")
-            self.logger.debug(f"Problematic JSON string: {response}")
+            self.logger.debug("Problematic JSON string: %s", response)
             return []
         except Exception as e:
             self.logger.error(f"Error designing experiment: {e}")
@@ -168,17 +178,15 @@ IMPORTANT: Your response must be a valid JSON object containing only the 'experi
                     self.model_name,
                     messages=[
                         {"role": "system", "content": "You are an AI assistant specialized in fixing experiment steps. Always respond with valid JSON containing only the fixed step."},
-                        {"role": "user", "content": json.dumps(prompt)}
+                        {"role": "user", "content": orjson.dumps(prompt).decode()}
                     ],
                     max_tokens=3500,
                     temperature=0.7,
                 )
-                self.logger.debug(f"LLM response for web request fix (attempt {attempt + 1}): {response}")
-                
-                # Remove any potential markdown formatting
-                cleaned_response = re.sub(r'^```json\n|\n```$', '', response.strip())
+                self.logger.debug("LLM response for web request fix (attempt %d): %s", attempt + 1, response)
                 
-                fixed_step = json.loads(cleaned_response)
+                # Strips any markdown formatting; None fails the structure check below
+                fixed_step = parse_llm_response(response)
                 
                 if isinstance(fixed_step, dict) and 'url' in fixed_step and fixed_step.get('action') == 'web_request':
                     return fixed_step
@@ -209,33 +217,32 @@ else:
         """
         self.logger.info("Parsing text response...")
         experiment_plan = []
-        step_pattern = re.compile(r'Step (\d+):(.*?)(?=Step \d+:|$)', re.DOTALL)
-        steps = step_pattern.findall(response)
+        steps = _STEP_RE.findall(response)
 
         for step_num, step_content in steps:
-            action_match = re.search(r'Action: (\w+)', step_content)
+            action_match = _ACTION_RE.search(step_content)
             if action_match:
                 action = action_match.group(1)
                 step = {'action': action}
                 
                 # Extract other parameters based on the action
                 if action == 'run_python_code':
-                    code_match = re.search(r'Code:(.*?)(?=\n\w+:|$)', step_content, re.DOTALL)
+                    code_match = _CODE_RE.search(step_content)
                     if code_match:
                         step['code'] = code_match.group(1).strip()
                 elif action == 'use_llm_api':
-                    prompt_match = re.search(r'Prompt:(.*?)(?=\n\w+:|$)', step_content, re.DOTALL)
+                    prompt_match = _PROMPT_RE.search(step_content)
                     if prompt_match:
                         step['prompt'] = prompt_match.group(1).strip()
                 elif action == 'web_request':
-                    url_match = re.search(r'URL: (.*?)(?=\n|$)', step_content)
-                    method_match = re.search(r'Method: (GET|POST|PUT|DELETE)', step_content)
+                    url_match = _URL_RE.search(step_content)
+                    method_match = _METHOD_RE.search(step_content)
                     if url_match:
                         step['url'] = url_match.group(1).strip()
                     if method_match:
                         step['method'] = method_match.group(1)
                 elif action == 'use_gpu':
-                    task_match = re.search(r'Task:(.*?)(?=\n\w+:|$)', step_content, re.DOTALL)
+                    task_match = _TASK_RE.search(step_content)
                     if task_match:
                         step['task'] = task_match.group(1).strip()
                 
@@ -310,18 +317,20 @@ else:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI assistant helping to adjust experiment plans."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=500,
                 temperature=0.7
             )
 
-            self.logger.debug(f"Raw LLM response for plan adjustment: {response}")
+            self.logger.debug("Raw LLM response for plan adjustment: %s", response)
 
             # Try to extract JSON from the response
-            json_match = re.search(r'\{.*\}', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(0)
+            # The object spans from the first '{' to the last '}'
+            start = response.find('{')
+            end = response.rfind('}')
+            if 0 <= start < end:
+                json_str = response[start:end + 1]
                 adjusted_step = json.loads(json_str)
                 self.logger.info(f"Successfully adjusted step: {adjusted_step}")
                 return adjusted_step
@@ -331,7 +340,7 @@ else:
 
         except json.JSONDecodeError as e:
             self.logger.error(f"Failed to parse LLM response for plan adjustment: {e}")
-            self.logger.debug(f"Problematic JSON string: {json_str}")
+            self.logger.debug("Problematic JSON string: %s", json_str)
             return None
         except Exception as e:
             self.logger.error(f"Unexpected error in plan adjustment: {e}")
@@ -6,9 +6,8 @@ import requests
 import openai
 from utils.logger import setup_logger
 from utils.resource_manager import ResourceManager
-import json
+import orjson
 import traceback
-import re
 from utils.openai_utils import create_completion, handle_api_error
 from utils.config import initialize_openai
 from utils.json_utils import parse_llm_response, extract_json_from_text
@@ -192,7 +191,7 @@ class ExperimentExecutor:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI code reviewer and debugger specializing in Python syntax and best practices."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens,
                 temperature=0.7,
@@ -270,20 +269,19 @@ class ExperimentExecutor:
                 # Add a general package and model handling preamble
                 preamble = """
 import importlib
+import importlib.util
 import subprocess
 import sys
 
+# find_spec only locates a package, so these checks don't pay for importing
+# numpy, pandas, spacy, ... (or loading a spaCy model) in every experiment run
 def ensure_package(package_name):
-    try:
-        importlib.import_module(package_name)
-    except ImportError:
+    if importlib.util.find_spec(package_name) is None:
         subprocess.check_call([sys.executable, "-m", "pip", "install", package_name])
 
 def ensure_spacy_model(model_name):
-    import spacy
-    try:
-        nlp = spacy.load(model_name)
-    except OSError:
+    # spaCy models are installed as packages named after the model
+    if importlib.util.find_spec(model_name) is None:
         subprocess.check_call([sys.executable, "-m", "spacy", "download", model_name])
 
 # Ensure common packages are available
@@ -338,7 +336,7 @@ ensure_spacy_model('en_core_web_sm')
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI assistant helping with experiment execution. Always respond with valid JSON."},
-                    {"role": "user", "content": json.dumps(payload)}
+                    {"role": "user", "content": orjson.dumps(payload).decode()}
                 ],
                 max_tokens=3500
             )
@@ -423,17 +421,3 @@ else:
 """
         
         return executor.use_gpu(task)
-
-def parse_llm_response(response):
-    # Existing code...
-    pass
-
-def extract_json_from_text(text):
-    # Try to find JSON-like structure in the text
-    json_match = re.search(r'\{(?:[^{}]|(?:\{[^{}]*\}))*\}', text)
-    if json_match:
-        try:
-            return json.loads(json_match.group(0))
-        except json.JSONDecodeError:
-            return None
-    return None
\ No newline at end of file
@@ -1,6 +1,7 @@
 # feedback_loop.py
 
 import json
+import orjson
 from utils.logger import setup_logger
 from utils.openai_utils import create_completion
 
@@ -19,7 +20,7 @@ class FeedbackLoop:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI research assistant. Refine the experiment plan based on the initial results."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens
             )
@@ -3,6 +3,7 @@
 import os
 import re  # Import regex module
 import json  # Import JSON module for parsing
+import orjson
 import ast  # Import AST module for safer parsing
 from utils.logger import setup_logger
 from utils.openai_utils import create_completion
@@ -35,7 +36,7 @@ class IdeaEvaluator:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI research assistant. Evaluate the given ideas based on their potential impact, feasibility, and originality."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens
             )
@@ -116,19 +117,20 @@ Example output format:
                 "output_format": "JSON"
             }
             
-            self.debug_logger.debug(f"Evaluation prompt: {json.dumps(prompt)}")
+            if self.debug_logger.isEnabledFor(logging.DEBUG):
+                self.debug_logger.debug("Evaluation prompt: %s", json.dumps(prompt))
             
             response = create_completion(
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI assistant specialized in evaluating research ideas."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens,
                 temperature=0.7
             )
             
-            self.debug_logger.debug(f"Raw API response: {response}")
+            self.debug_logger.debug("Raw API response: %s", response)
             
             evaluation_data = parse_llm_response(response)
             
@@ -2,6 +2,7 @@
 
 import os
 import json
+import orjson
 from utils.logger import setup_logger
 from utils.openai_utils import create_completion
 from utils.config import initialize_openai
@@ -62,21 +63,21 @@ class IdeaGenerator:
             }
 
             # Log the prompt for debugging purposes
-            self.logger.info(f"\nPrompt sent to API:\n{prompt}")
+            self.logger.info("\nPrompt sent to API:\n%s", prompt)
 
             # Send the prompt to the OpenAI API
             response = create_completion(
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI research assistant specializing in generating innovative ideas for AI system improvement."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens,
                 temperature=0.7
             )
             
             # Log the raw API response for debugging
-            self.logger.info(f"\nRaw API response:\n{response}")
+            self.logger.info("\nRaw API response:\n%s", response)
             
             parsed_response = parse_llm_response(response)
             if parsed_response is None:
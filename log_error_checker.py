@@ -5,6 +5,7 @@ import logging
 from utils.logger import setup_logger
 from utils.openai_utils import create_completion
 from utils.config import initialize_openai
+from utils.constants import is_chat_model
 
 class LogErrorChecker:
     def __init__(self, model_name):
@@ -22,10 +23,7 @@ class LogErrorChecker:
                 f"Provide a list of issues found and suggest possible fixes.\n\n{log_contents}"
             )
             
-            chat_models = ['gpt-3.5-turbo', 'gpt-4', 'gpt-4-0314', 'gpt-4-32k', 'gpt-3.5-turbo-0301', 'gpt-4o', 'gpt-4o-mini', 'o1-preview', 'o1-mini']
-            is_chat_model = any(self.model_name.lower().startswith(model.lower()) for model in chat_models)
-            
-            if is_chat_model:
+            if is_chat_model(self.model_name):
                 response = create_completion(
                     self.model_name,
                     messages=[
@@ -43,7 +41,7 @@ class LogErrorChecker:
                     temperature=0.5,
                 )
             
-            self.logger.info(f"Log analysis results: {response}")
+            self.logger.info("Log analysis results: %s", response)
             return response
         except Exception as e:
             self.logger.error(f"Error checking logs: {e}")
@@ -99,11 +99,11 @@ def main():
     # Define supported models for validation
     chat_models = ['gpt-3.5-turbo', 'gpt-4', 'gpt-4o', 'gpt-4o-mini', 'o1-preview', 'o1-mini']
     completion_models = ['text-davinci-003', 'text-curie-001', 'text-babbage-001', 'text-ada-001']
-    supported_models = chat_models + completion_models
+    supported_models = tuple(model.lower() for model in chat_models + completion_models)
 
     # Normalize and validate the model name
     model_name = args.model_name.strip()
-    if not any(model_name.lower().startswith(model.lower()) for model in supported_models):
+    if not model_name.lower().startswith(supported_models):
         print(f"Error: Unsupported model_name '{model_name}'. Please choose a supported model.")
         sys.exit(1)
 
@@ -138,6 +138,9 @@ def main():
     # Initialize Benchmarking with SystemAugmentor
     benchmarking = Benchmarking(system_augmentor)
 
+    # Record what each run produces; the benchmarks read it back through the same instance
+    research_history = system_augmentor.history
+
     try:
         # Initialize variable to store previous performance metrics
         previous_performance = None
@@ -172,6 +175,7 @@ def main():
                         if idea_hash not in all_idea_hashes:
                             all_idea_hashes.add(idea_hash)
                             generated_ideas.append(idea)
+                            research_history.record('idea', idea)
                             main_logger.info(f"Generated idea: {idea[:100]}...")  # Log each generated idea
                             if len(generated_ideas) == args.num_ideas:
                                 break
@@ -214,7 +218,8 @@ def main():
                     continue
 
                 main_logger.info("Experiment plan designed successfully.")
-                main_logger.debug(f"Experiment plan: {experiment_plan}")  # Add this line for debugging
+                research_history.record('experiment_design', experiment_plan)
+                main_logger.debug("Experiment plan: %s", experiment_plan)  # Add this line for debugging
 
                 # New Step: Experiment Coding
                 print("\n--- Starting Experiment Coding ---")
@@ -228,7 +233,7 @@ def main():
                         continue
                     print("Experiment code generated successfully.")
                     main_logger.info("Experiment code generated successfully.")
-                    main_logger.debug(f"Experiment package: {experiment_package}")
+                    main_logger.debug("Experiment package: %s", experiment_package)
                 except Exception as e:
                     print(f"Error during experiment coding: {str(e)}")
                     main_logger.error(f"Error during experiment coding: {str(e)}")
@@ -238,7 +243,10 @@ def main():
 
                 # Step 4: Experiment Execution
                 main_logger.info("Executing experiment...")
+                execution_start = time.time()
                 results = experiment_executor.execute_experiment(experiment_package)
+                research_history.record('experiment_execution', success=bool(results) and 'error' not in results,
+                                        duration_s=time.time() - execution_start)
                 if not results:
                     main_logger.error("Failed to execute experiment. Skipping this experiment run.")
                     continue
@@ -253,7 +261,8 @@ def main():
                     refined_experiment_package = experiment_package
                 else:
                     main_logger.info("Experiment plan refined successfully.")
-                    main_logger.debug(f"Refined plan: {json.dumps(refined_experiment_package, indent=2)}")
+                    if main_logger.isEnabledFor(logging.DEBUG):
+                        main_logger.debug("Refined plan: %s", json.dumps(refined_experiment_package, indent=2))
 
                 # Step 6: Refined Experiment Execution
                 main_logger.info("Executing refined experiment...")
@@ -262,6 +271,7 @@ def main():
                     main_logger.error("Failed to execute refined experiment. Skipping this experiment run.")
                     continue
                 main_logger.info("Refined experiment executed successfully.")
+                research_history.record('research_application', {'idea': best_idea['idea'], 'results': final_results})
 
                 # Step 7: System Augmentation
                 main_logger.info("Augmenting system...")
@@ -292,6 +302,12 @@ def main():
                 main_logger.info("Writing report...")
                 report_writer = ReportWriter()
                 report_writer.write_report(best_idea, refined_experiment_package, final_results, current_performance)
+                research_history.record('report', {
+                    'idea': best_idea['idea'],
+                    'experiment_plan': refined_experiment_package,
+                    'results': final_results,
+                    'performance_metrics': current_performance
+                })
                 main_logger.info("Report written successfully.")
 
                 # Step 10: Log Error Checking
@@ -311,6 +327,8 @@ def main():
                 # Run tests after modifications
                 main_logger.info("Running all tests...")
                 test_result = os.system('python -m unittest discover tests')
+                if errors_warnings:
+                    research_history.record('error_fix', errors_warnings, success=test_result == 0)
                 if test_result != 0:
                     main_logger.error("Tests failed. Reverting changes and terminating the experiment run.")
                     if backup_path:
@@ -1,107 +1,177 @@
 # system_augmentation.py
 
 import os
+import re
+import sys
 import ast
+import asyncio
+import importlib.util
 import astor
 import subprocess
 import json
+import orjson
 import time
-from tenacity import retry, stop_after_attempt, wait_exponential
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+from typing import Union
 from utils.logger import setup_logger
-from utils.openai_utils import create_completion
-from utils.config import initialize_openai
-from utils.metrics import PerformanceMetrics, evaluate_system_performance, generate_performance_report, calculate_overall_performance_score
-from utils.json_utils import parse_llm_response
+from utils.openai_utils import create_completion, acreate_completion, grader_async_client, run_async, CircuitBreaker
+from utils.config import initialize_openai, GRADER_MODEL
+from utils.history import ResearchHistory
+from utils.metrics import Metric, PerformanceMetrics, evaluate_system_performance, generate_performance_report
+
+# Fixed grading rubric shared by every LLM-graded benchmark. It is sent as the
+# first message, byte-identical on every call, so the provider's automatic
+# prompt-prefix caching can reuse it; only the item payload after it varies.
+RUBRIC_PREAMBLE = (
+    "You are an AI research assistant acting as a strict, consistent grader for the AI Research System. "
+    "You will receive a task name, a list of evaluation criteria and a list of items. "
+    "Evaluate each item on a scale of 0 to 10 based on the given criteria, weighing all criteria equally. "
+    "Provide a single numeric score for each item, in the same order as the items are given. "
+    "Always provide your response in the exact JSON format {\"scores\": [...]} with no text outside the JSON object."
+)
+_PREFIX_MSG = {"role": "system", "content": RUBRIC_PREAMBLE}
+_USER_PREFIX = "Score each item 0-10 in JSON as {\"scores\":[...]}\nITEMS:\n"
+# Structured-output schema for grader replies, so the server only returns conforming JSON
+SCORE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "scores": {
+            "type": "array",
+            "items": {"type": "number", "minimum": 0, "maximum": 10}
+        }
+    },
+    "required": ["scores"],
+    "additionalProperties": False
+}
+_SCORE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "scores", "schema": SCORE_SCHEMA, "strict": True}
+}
+
+# Calls that proposed modifications are not allowed to make.
+# This is a basic check and should be expanded based on your specific security requirements
+_BANNED_CALLS = frozenset({'os.system', 'subprocess.call', 'eval', 'exec'})
+# Single-pass prefilter over the source: the AST walk can only find a banned call if the
+# called name itself (`system` in `os.system`) appears in the text, so most files skip the
+# walk entirely. Only bare names are matched; `(os).system` or a line continuation between
+# `os.` and `system` still produces a call the walk reports.
+_BANNED_CALL_RE = re.compile(r"\b(?:" + "|".join(
+    sorted({re.escape(name.rsplit('.', 1)[-1]) for name in _BANNED_CALLS})
+) + r")\b")
+
+def _dotted_name(node):
+    """
+    Resolves a call target such as `os.system` to its dotted name, or None if it isn't a plain name chain.
+    """
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+def _hash_ids(items):
+    """
+    Maps hashable items to a sorted array of unique uint64 ids.
+    """
+    return np.unique(np.fromiter((hash(item) & 0xFFFFFFFFFFFFFFFF for item in items), dtype=np.uint64))
+
+class _SafetyVisitor(ast.NodeVisitor):
+    """
+    Collects calls to banned functions while walking a parsed module.
+    """
+    def __init__(self):
+        self.unsafe_calls = []
+
+    def visit_Call(self, node):
+        name = _dotted_name(node.func)
+        if name in _BANNED_CALLS:
+            self.unsafe_calls.append(name)
+        self.generic_visit(node)
 
 class SystemAugmentor:
-    def __init__(self, model_name=None, max_tokens=4000):
+    def __init__(self, model_name=None, max_tokens=4000, grader_model=None, backup_store='.sysaug'):
         initialize_openai()
         self.model_name = model_name or "gpt-4"  # Default model if none provided
+        self.grader_model = grader_model or GRADER_MODEL  # Cheaper model for benchmark grading
         self.max_tokens = max_tokens
         self.logger = setup_logger('system_augmentation', 'logs/system_augmentation.log')
         self.previous_performance = None
+        self.history = ResearchHistory()
+        self.grader_breaker = CircuitBreaker()
         self.max_retries = 3
         self.backoff_factor = 2
+        # Originals of modified files live in a content-addressed store; the manifest maps
+        # file_path -> sha1 for every file this run modified since its last revert. It is kept
+        # per run and only written out for recovery by hand, so a manifest left by an earlier
+        # or crashed run is never restored into this one.
+        self.backup_store = backup_store
+        self.run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{id(self):x}"
+        self._backups = {}
 
     def _run_benchmarks(self) -> PerformanceMetrics:
+        return run_async(self._run_benchmarks_async())
+
+    async def _run_benchmarks_async(self) -> PerformanceMetrics:
         # Implement benchmark tests for each metric
         metrics = PerformanceMetrics()
-        
-        # Example (replace with actual benchmark logic):
-        metrics.update('idea_quality', self._benchmark_idea_quality())
-        metrics.update('idea_evaluation_effectiveness', self._benchmark_idea_evaluation())
-        metrics.update('experiment_design_quality', self._benchmark_experiment_design())
-        metrics.update('experiment_execution_efficiency', self._benchmark_experiment_execution())
-        metrics.update('research_application_creativity', self._benchmark_research_application())
-        metrics.update('system_reliability', self._benchmark_system_reliability())
-        metrics.update('coding_task_performance', self._benchmark_coding_task())
-        metrics.update('report_quality', self._benchmark_report_quality())
-        metrics.update('log_error_checking_accuracy', self._benchmark_log_error_checking())
-        metrics.update('error_fixing_effectiveness', self._benchmark_error_fixing())
+
+        # The benchmarks are independent and I/O-bound, so run them concurrently:
+        # LLM-graded ones share the event loop, the rest run in worker threads.
+        benchmarks = {
+            Metric.IDEA_QUALITY: self._benchmark_idea_quality(),
+            Metric.IDEA_EVALUATION_EFFECTIVENESS: asyncio.to_thread(self._benchmark_idea_evaluation),
+            Metric.EXPERIMENT_DESIGN_QUALITY: self._benchmark_experiment_design(),
+            Metric.EXPERIMENT_EXECUTION_EFFICIENCY: asyncio.to_thread(self._benchmark_experiment_execution),
+            Metric.RESEARCH_APPLICATION_CREATIVITY: self._benchmark_research_application(),
+            Metric.SYSTEM_RELIABILITY: asyncio.to_thread(self._benchmark_system_reliability),
+            Metric.CODING_TASK_PERFORMANCE: asyncio.to_thread(self._benchmark_coding_task),
+            Metric.REPORT_QUALITY: self._benchmark_report_quality(),
+            Metric.LOG_ERROR_CHECKING_ACCURACY: asyncio.to_thread(self._benchmark_log_error_checking),
+            Metric.ERROR_FIXING_EFFECTIVENESS: asyncio.to_thread(self._benchmark_error_fixing)
+        }
+        # Wait for every benchmark even if one fails, so no grading call is left pending on the
+        # shared event loop to resume (and spend API calls) during the next run_async
+        results = await asyncio.gather(*benchmarks.values(), return_exceptions=True)
+        for metric, value in zip(benchmarks, results):
+            if isinstance(value, Exception):
+                self.logger.error(f"Benchmark {metric.name} failed: {value!r}")
+                value = 0.0
+            metrics.update(metric, value)
 
         return metrics
 
-    def _benchmark_idea_quality(self) -> float:
+    async def _benchmark_idea_quality(self) -> float:
         # Collect recent ideas generated by the system
-        recent_ideas = self._get_recent_ideas(n=10)  # Get last 10 ideas
+        recent_ideas = await asyncio.to_thread(self._get_recent_ideas, n=10)  # Get last 10 ideas
         
         # Use the AI model to evaluate each idea
-        prompt = {
-            "task": "evaluate_ideas",
-            "ideas": recent_ideas,
-            "criteria": [
-                "Novelty",
-                "Feasibility",
-                "Potential impact"
-            ],
-            "instructions": "Evaluate each idea on a scale of 0 to 10 based on the given criteria. Provide a single numeric score for each idea.",
-            "output_format": "JSON"
-        }
-        
-        response = self._get_model_response(prompt)
-        parsed_response = parse_llm_response(response)
-        if parsed_response:
-            scores = parsed_response.get('scores', [])
-            scores = [float(score) / 10 for score in scores if isinstance(score, (int, float, str)) and str(score).replace('.', '').isdigit()]
-        else:
-            self.logger.warning(f"Invalid JSON response: {response}")
-            scores = []
-        
-        return sum(scores) / len(scores) if scores else 0.0
+        return await self._grade_items("evaluate_ideas", ["Novelty", "Feasibility", "Potential impact"], recent_ideas)
 
     def _benchmark_idea_evaluation(self) -> float:
         # Compare system's idea evaluations with expert evaluations
         system_evaluations = self._get_recent_idea_evaluations(n=5)
         expert_evaluations = self._get_expert_idea_evaluations(n=5)
         
-        accuracy = sum(1 for s, e in zip(system_evaluations, expert_evaluations) if abs(s - e) <= 0.1)
-        return accuracy / len(system_evaluations)
+        system_scores = np.fromiter(system_evaluations, dtype=float)
+        expert_scores = np.fromiter(expert_evaluations, dtype=float)
+        paired = min(len(system_scores), len(expert_scores))
+        accuracy = np.count_nonzero(np.abs(system_scores[:paired] - expert_scores[:paired]) <= 0.1)
+        return accuracy / len(system_scores)
 
-    def _benchmark_experiment_design(self) -> float:
-        recent_designs = self._get_recent_experiment_designs(n=5)
-        
-        prompt = {
-            "task": "evaluate_experiment_designs",
-            "designs": recent_designs,
-            "criteria": [
-                "Clarity",
-                "Feasibility",
-                "Potential to yield meaningful results"
-            ],
-            "instructions": "Evaluate each experiment design on a scale of 0 to 10 based on the given criteria. Provide a single numeric score for each design.",
-            "output_format": "JSON"
-        }
+    async def _benchmark_experiment_design(self) -> float:
+        recent_designs = await asyncio.to_thread(self._get_recent_experiment_designs, n=5)
         
-        response = self._get_model_response(prompt)
-        parsed_response = parse_llm_response(response)
-        if parsed_response:
-            scores = parsed_response.get('scores', [])
-            scores = [float(score) / 10 for score in scores if isinstance(score, (int, float, str)) and str(score).replace('.', '').isdigit()]
-        else:
-            self.logger.warning(f"Invalid JSON response: {response}")
-            scores = []
-        
-        return sum(scores) / len(scores) if scores else 0.0
+        return await self._grade_items(
+            "evaluate_experiment_designs",
+            ["Clarity", "Feasibility", "Potential to yield meaningful results"],
+            recent_designs
+        )
 
     def _benchmark_experiment_execution(self) -> float:
         recent_executions = self._get_recent_experiment_executions(n=5)
@@ -116,30 +186,10 @@ class SystemAugmentor:
         
         return (time_score + success_rate) / 2
 
-    def _benchmark_research_application(self) -> float:
-        recent_applications = self._get_recent_research_applications(n=5)
+    async def _benchmark_research_application(self) -> float:
+        recent_applications = await asyncio.to_thread(self._get_recent_research_applications, n=5)
         
-        prompt = {
-            "task": "evaluate_research_applications",
-            "applications": recent_applications,
-            "criteria": [
-                "Creativity",
-                "Effectiveness"
-            ],
-            "instructions": "Evaluate each application of research findings on a scale of 0 to 10 based on the given criteria. Provide a single numeric score for each application.",
-            "output_format": "JSON"
-        }
-        
-        response = self._get_model_response(prompt)
-        parsed_response = parse_llm_response(response)
-        if parsed_response:
-            scores = parsed_response.get('scores', [])
-            scores = [float(score) / 10 for score in scores if isinstance(score, (int, float, str)) and str(score).replace('.', '').isdigit()]
-        else:
-            self.logger.warning(f"Invalid JSON response: {response}")
-            scores = []
-        
-        return sum(scores) / len(scores) if scores else 0.0
+        return await self._grade_items("evaluate_research_applications", ["Creativity", "Effectiveness"], recent_applications)
 
     def _benchmark_system_reliability(self) -> float:
         # Check system uptime and error rate over the last 24 hours
@@ -157,40 +207,26 @@ class SystemAugmentor:
         successful = sum(1 for challenge in challenges if self._run_coding_challenge(challenge))
         return successful / len(challenges)
 
-    def _benchmark_report_quality(self) -> float:
-        recent_reports = self._get_recent_reports(n=3)
+    async def _benchmark_report_quality(self) -> float:
+        recent_reports = await asyncio.to_thread(self._get_recent_reports, n=3)
         
-        prompt = {
-            "task": "evaluate_reports",
-            "reports": recent_reports,
-            "criteria": [
-                "Clarity",
-                "Comprehensiveness",
-                "Adherence to report requirements"
-            ],
-            "instructions": "Evaluate each report on a scale of 0 to 10 based on the given criteria. Provide a single numeric score for each report.",
-            "output_format": "JSON"
-        }
-        
-        response = self._get_model_response(prompt)
-        parsed_response = parse_llm_response(response)
-        if parsed_response:
-            scores = parsed_response.get('scores', [])
-            scores = [float(score) / 10 for score in scores if isinstance(score, (int, float, str)) and str(score).replace('.', '').isdigit()]
-        else:
-            self.logger.warning(f"Invalid JSON response: {response}")
-            scores = []
-        
-        return sum(scores) / len(scores) if scores else 0.0
+        return await self._grade_items(
+            "evaluate_reports",
+            ["Clarity", "Comprehensiveness", "Adherence to report requirements"],
+            recent_reports
+        )
 
     def _benchmark_log_error_checking(self) -> float:
         # Compare system's error detections with manually identified errors
         system_errors = self._get_system_detected_errors()
         manual_errors = self._get_manually_identified_errors()
         
-        true_positives = len(set(system_errors) & set(manual_errors))
-        false_positives = len(set(system_errors) - set(manual_errors))
-        false_negatives = len(set(manual_errors) - set(system_errors))
+        # Compare fixed-width hashes instead of the error objects themselves
+        system_ids = _hash_ids(system_errors)
+        manual_ids = _hash_ids(manual_errors)
+        true_positives = np.intersect1d(system_ids, manual_ids, assume_unique=True).size
+        false_positives = system_ids.size - true_positives
+        false_negatives = manual_ids.size - true_positives
         
         precision = true_positives / (true_positives + false_positives) if (true_positives + false_positives) > 0 else 0
         recall = true_positives / (true_positives + false_negatives) if (true_positives + false_negatives) > 0 else 0
@@ -203,6 +239,49 @@ class SystemAugmentor:
         successful_fixes = sum(1 for fix in recent_fixes if fix['success'])
         return successful_fixes / len(recent_fixes)
 
+    def _get_recent_ideas(self, n):
+        return self.history.recent_payloads('idea', n)
+
+    def _get_recent_experiment_designs(self, n):
+        return self.history.recent_payloads('experiment_design', n)
+
+    def _get_recent_research_applications(self, n):
+        return self.history.recent_payloads('research_application', n)
+
+    def _get_recent_reports(self, n):
+        return self.history.recent_payloads('report', n)
+
+    def _get_recent_experiment_executions(self, n):
+        rows = self.history.recent('experiment_execution', n, columns=('success', 'duration_s'))
+        # The execution benchmark measures time in hours
+        return [{'time': (row['duration_s'] or 0.0) / 3600, 'success': bool(row['success'])} for row in rows]
+
+    def _get_recent_error_fixes(self, n):
+        rows = self.history.recent('error_fix', n, columns=('success',))
+        return [{'success': bool(row['success'])} for row in rows]
+
+    async def _grade_items(self, task, criteria, items) -> float:
+        """
+        Scores items against the shared rubric and returns the mean score normalised to 0-1.
+        """
+        # Invariant fields first and the variable items last, so consecutive
+        # grading calls share the longest possible identical prefix.
+        prompt = {
+            "task": task,
+            "criteria": criteria,
+            "items": items
+        }
+
+        parsed_response = await self._get_model_response(prompt)
+        if isinstance(parsed_response, dict):
+            scores = parsed_response.get('scores', [])
+            scores = [float(score) / 10 for score in scores if isinstance(score, (int, float, str)) and str(score).replace('.', '').isdigit()]
+        else:
+            self.logger.warning(f"Invalid JSON response: {parsed_response}")
+            scores = []
+        
+        return sum(scores) / len(scores) if scores else 0.0
+
     def _evaluate_performance_improvement(self):
         current_performance = self._run_benchmarks()
         
@@ -218,8 +297,8 @@ class SystemAugmentor:
         report = generate_performance_report(self.previous_performance.get_all(), current_performance.get_all())
         self.logger.info(f"Performance Report:\n{report}")
 
-        current_score = calculate_overall_performance_score(current_performance.get_all())
-        previous_score = calculate_overall_performance_score(self.previous_performance.get_all())
+        current_score = current_performance.overall_score()
+        previous_score = self.previous_performance.overall_score()
 
         if current_score > previous_score:
             self.previous_performance = current_performance
@@ -235,22 +314,23 @@ class SystemAugmentor:
                 self.model_name,
                 messages=[
                     {"role": "system", "content": "You are an AI research assistant. Suggest improvements to the AI Research System based on the experiment results."},
-                    {"role": "user", "content": json.dumps(prompt)}
+                    {"role": "user", "content": orjson.dumps(prompt).decode()}
                 ],
                 max_tokens=self.max_tokens,
                 temperature=0.7,
             )
             
             self.logger.info(f"Received model response. Length: {len(response)}")
-            self.logger.debug(f"Model response content: {response[:500]}...")  # Log first 500 characters
+            self.logger.debug("Model response content: %.500s...", response)  # Log first 500 characters
 
             parsed_response = self._parse_modifications(response)
             if not parsed_response:
                 self.logger.warning("No valid modifications found in the model response.")
                 return
 
-            if self._validate_modifications(parsed_response):
-                self._apply_code_modifications(parsed_response)
+            patch_plan = self._validate_modifications(parsed_response)
+            if patch_plan:
+                self._apply_code_modifications(patch_plan)
                 if self._run_tests():
                     performance_improvement = self._evaluate_performance_improvement()
                     if performance_improvement:
@@ -266,41 +346,46 @@ class SystemAugmentor:
         except Exception as e:
             self.logger.error(f"Error augmenting system: {e}", exc_info=True)
 
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def _get_model_response(self, prompt):
+    async def _get_model_response(self, prompt) -> Union[dict, list]:
         """
-        Gets the response from the OpenAI model with retry mechanism.
+        Gets the parsed JSON response from the grader model.
+        The reply is constrained to SCORE_SCHEMA, so there is no parse-and-retry loop; transient API
+        errors are retried by acreate_completion and repeated failures open the grader's circuit breaker.
         """
-        self.logger.debug(f"Attempting to get response from model: {self.model_name}")
-        
+        self.logger.debug(f"Attempting to get response from model: {self.grader_model}")
+        self.grader_breaker.check()
+
+        messages = [
+            _PREFIX_MSG,
+            {"role": "user", "content": _USER_PREFIX + orjson.dumps(prompt).decode()}
+        ]
         try:
-            response = create_completion(
-                self.model_name,
-                messages=[
-                    {"role": "system", "content": "You are an AI research assistant. Always provide your response in the exact JSON format specified in the instructions."},
-                    {"role": "user", "content": json.dumps(prompt)}
-                ],
+            response = await acreate_completion(
+                self.grader_model,
+                messages=messages,
                 max_tokens=3500,
                 temperature=0.7,
+                client=grader_async_client,
+                response_format=_SCORE_RESPONSE_FORMAT,
             )
             
-            # Attempt to parse the response as JSON
-            parsed_response = json.loads(response)
+            # Parse once; callers consume the parsed object directly
+            parsed_response = orjson.loads(response)
             self.logger.debug(f"Successfully received and parsed response from model.")
-            return json.dumps(parsed_response)  # Ensure valid JSON string
-        except json.JSONDecodeError as e:
-            self.logger.error(f"Failed to parse model response as JSON: {e}")
-            raise  # Retry will be triggered
+            self.grader_breaker.record_success()
+            return parsed_response
         except Exception as e:
+            self.grader_breaker.record_failure()
             self.logger.error(f"Error getting model response: {e}")
-            raise  # Retry will be triggered
+            raise
 
     def _parse_modifications(self, response):
         self.logger.info("Parsing code modifications...")
         parsed_modifications = []
         
         try:
-            modifications = json.loads(response)
+            # Accept either the raw model output or already-parsed JSON
+            modifications = orjson.loads(response) if isinstance(response, (str, bytes)) else response
             
             if isinstance(modifications, dict):
                 modifications = [modifications]  # Convert single modification to list
@@ -327,53 +412,60 @@ class SystemAugmentor:
         
         except json.JSONDecodeError as e:
             self.logger.error(f"Failed to parse response as JSON: {e}")
-            self.logger.debug(f"Raw response: {response}")
+            self.logger.debug("Raw response: %s", response)
         
         return parsed_modifications
 
     def _validate_modifications(self, modifications):
+        """
+        Returns the patch plan, a list of (file_path, changes), or an empty list if any
+        modification is invalid. Each change is parsed once here and written as-is afterwards.
+        """
         self.logger.info("Validating proposed modifications...")
         
         if not modifications:
             self.logger.warning("No modifications to validate.")
-            return False
+            return []
         
+        patch_plan = []
         for file_path, changes in modifications:
             if not os.path.exists(file_path):
                 self.logger.error(f"File does not exist: {file_path}")
-                return False
+                return []
             
             try:
-                ast.parse(changes)
+                tree = ast.parse(changes)
             except SyntaxError as e:
                 self.logger.error(f"Syntax error in proposed changes for {file_path}: {e}")
-                return False
+                return []
             
-            # Additional validation checks
-            if self._contains_unsafe_operations(changes):
-                self.logger.error(f"Unsafe operations detected in changes for {file_path}")
-                return False
+            # Additional validation checks, done on the same tree so that
+            # mentions in comments or strings don't count as calls
+            visitor = _SafetyVisitor()
+            if _BANNED_CALL_RE.search(changes):
+                visitor.visit(tree)
+            if visitor.unsafe_calls:
+                self.logger.error(f"Unsafe operations detected in changes for {file_path}: {visitor.unsafe_calls}")
+                return []
             
             if not self._changes_are_relevant(file_path, changes):
                 self.logger.warning(f"Changes for {file_path} don't seem relevant to the file's purpose")
-                return False
+                return []
+            
+            patch_plan.append((file_path, changes))
         
         self.logger.info("All modifications passed validation.")
-        return True
-
-    def _contains_unsafe_operations(self, code):
-        # This is a basic check and should be expanded based on your specific security requirements
-        unsafe_operations = ['os.system', 'subprocess.call', 'eval', 'exec']
-        return any(op in code for op in unsafe_operations)
+        return patch_plan
 
     def _changes_are_relevant(self, file_path, changes):
         # This is a placeholder function. Implement logic to check if changes are relevant to the file's purpose
         # For example, you could check if the changes modify the main classes/functions in the file
         return True
 
-    def _apply_code_modifications(self, code_modifications):
+    def _apply_code_modifications(self, patch_plan):
         self.logger.info("Applying code modifications...")
-        for file_path, changes in code_modifications:
+        # The plan was validated already; write the source as-is, unchanged files are skipped by _modify_file
+        for file_path, changes in patch_plan:
             self._modify_file(file_path, changes)
         
         # Run tests after applying modifications
@@ -383,24 +475,88 @@ class SystemAugmentor:
 
     def _modify_file(self, file_path, changes):
         self.logger.info(f"Modifying file: {file_path}")
-        backup_path = f"{file_path}.bak"
-        
-        # Create a backup of the original file
-        os.rename(file_path, backup_path)
-        
+        with open(file_path, 'rb') as file:
+            original = file.read()
+        new_content = changes.encode()
+        if new_content == original:
+            self.logger.info(f"No changes for {file_path}, skipping.")
+            return
+
+        # Store the original content once per file, unless an earlier
+        # modification that hasn't been reverted yet already did
+        if file_path not in self._backups:
+            digest = hashlib.sha1(original).hexdigest()
+            self._store_object(original, digest)
+            self._backups[file_path] = digest
+            self._save_backup_manifest()
+
         try:
-            with open(file_path, 'w') as file:
-                file.write(changes)
+            # Write via a temp file so a half-written file is never left behind
+            self._replace_file(file_path, new_content)
             self.logger.info(f"Successfully modified {file_path}")
         except Exception as e:
             self.logger.error(f"Error modifying {file_path}: {e}")
-            os.rename(backup_path, file_path)  # Restore from backup
+            raise
+
+    def _objects_dir(self):
+        return os.path.join(self.backup_store, 'objects')
+
+    def _manifest_path(self):
+        return os.path.join(self.backup_store, 'runs', f'{self.run_id}.json')
+
+    def _save_backup_manifest(self):
+        manifest_path = self._manifest_path()
+        if not self._backups:
+            # Everything was reverted; nothing is left to recover
+            if os.path.exists(manifest_path):
+                os.remove(manifest_path)
+            return
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        with open(manifest_path, 'w') as manifest:
+            json.dump(self._backups, manifest, indent=2)
+
+    def _store_object(self, content, digest):
+        # Stored objects are copies, never hard links: a link would share its data with the
+        # live file (and code_backups), so any in-place write to one would corrupt the other
+        object_path = os.path.join(self._objects_dir(), digest)
+        if os.path.exists(object_path):
+            return
+        os.makedirs(self._objects_dir(), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self._objects_dir())
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(content)
+            os.replace(temp_path, object_path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def _replace_file(self, file_path, content):
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(content)
+            shutil.copymode(file_path, temp_path)
+            os.replace(temp_path, file_path)
+        except Exception:
+            os.unlink(temp_path)
             raise
 
     def _run_tests(self):
         self.logger.info("Running unit tests...")
+        # Always in a fresh interpreter: it imports the modified sources, and re-importing them in
+        # this long-lived process would repeat their module-level setup (log handlers, clients, ...)
+        return self._run_tests_subprocess()
+
+    def _run_tests_subprocess(self):
         try:
-            result = subprocess.run(['python', '-m', 'unittest', 'discover', 'tests'], capture_output=True, text=True)
+            result = subprocess.run(self._test_command(), capture_output=True, text=True)
+            # Tests unittest can't discover (e.g. plain pytest functions) must not count as a pass;
+            # pytest exits with an error when it collects none, unittest before 3.12 doesn't
+            if result.returncode == 0 and 'Ran 0 tests' in result.stderr:
+                self.logger.error("No tests were discovered in tests/.")
+                return False
             if result.returncode == 0:
                 self.logger.info("All tests passed successfully.")
                 return True
@@ -411,16 +567,25 @@ class SystemAugmentor:
             self.logger.error(f"Error running tests: {e}")
             return False
 
+    def _test_command(self):
+        # Spread the suite over all cores when pytest-xdist is installed, keeping
+        # each test module on one worker and stopping at the first failure.
+        if importlib.util.find_spec('xdist') is not None:
+            return [sys.executable, '-m', 'pytest', '-q', '-n', str(os.cpu_count() or 1),
+                    '--dist=loadfile', '--maxfail=1', 'tests']
+        return [sys.executable, '-m', 'unittest', 'discover', 'tests']
+
     def _revert_changes(self):
         self.logger.warning("Reverting changes...")
-        for root, dirs, files in os.walk("."):
-            for file in files:
-                if file.endswith(".bak"):
-                    original_file = file[:-4]  # Remove .bak extension
-                    backup_path = os.path.join(root, file)
-                    original_path = os.path.join(root, original_file)
-                    os.rename(backup_path, original_path)
-                    self.logger.info(f"Reverted changes to {original_file}")
+        for original_path, digest in self._backups.items():
+            object_path = os.path.join(self._objects_dir(), digest)
+            # Copied rather than linked, so the restored file doesn't share its data with the store
+            temp_path = f"{original_path}.sysaug-tmp"
+            shutil.copy2(object_path, temp_path)
+            os.replace(temp_path, original_path)
+            self.logger.info(f"Reverted changes to {original_path}")
+        self._backups.clear()
+        self._save_backup_manifest()
         self.logger.info("All changes have been reverted.")
 
     def _generate_augmentation_prompt(self, experiment_results):
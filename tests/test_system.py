@@ -1,142 +1,206 @@
 # tests/test_system.py
-from utils.json_utils import parse_llm_response
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock, mock_open
 from idea_generation import IdeaGenerator
 from idea_evaluation import IdeaEvaluator
 from experiment_design import ExperimentDesigner
-from experiment_execution import ExperimentExecutor
 from feedback_loop import FeedbackLoop
 from log_error_checker import LogErrorChecker
 from error_fixing import ErrorFixer
+import asyncio
 import logging
+import openai
 import json
 import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 from system_augmentation import SystemAugmentor
+from utils.history import ResearchHistory
+from utils.json_utils import extract_json_from_text, parse_llm_response, _find_short_json_text
+from utils.code_backup import backup_code, restore_code
+from utils.logger import setup_logger
+from utils.openai_utils import (
+    ClientPool, TokenBucket, TokenBudgetError, count_tokens, fit_max_tokens, run_async, normalize_messages, create_completion, acreate_completion, create_completion_stream, create_completions_batch, create_completion_batch_job, run_with_checkpoint,
+    wait_for_rate_limit,
+)
+from utils.llm_cache import LLMCache, SemanticCache
 
-class TestAIResearchSystem(unittest.TestCase):
-    def tearDown(self):
-        """
-        Remove all handlers associated with the logger to prevent ResourceWarnings.
-        """
-        loggers = [
-            'idea_generation',
-            'idea_evaluation',
-            'experiment_design',
-            'experiment_execution',
-            'feedback_loop',
-            'log_error_checker',
-            'error_fixing',
-            'main',
-            'debug'
+# Modules whose create_completion is replaced by COMPLETION_MOCK while the tests run
+COMPLETION_MODULES = [
+    'idea_generation',
+    'idea_evaluation',
+    'experiment_design',
+    'feedback_loop',
+    'log_error_checker',
+    'error_fixing',
+    'system_augmentation',
+]
+# The mock that stands in for create_completion, shared by all tests and reset before each one
+COMPLETION_MOCK = MagicMock()
+# Same for the async completions used by benchmark grading, so no test can reach the API
+ASYNC_COMPLETION_MOCK = AsyncMock()
+
+# Loggers whose log files are removed once the tests are done
+TEST_LOGGERS = [
+    'idea_generation',
+    'idea_evaluation',
+    'experiment_design',
+    'experiment_execution',
+    'feedback_loop',
+    'log_error_checker',
+    'error_fixing',
+    'main',
+    'debug'
+]
+
+# Expected results, shared by the canned replies below and the assertions
+EXPECTED_IDEAS = ('Idea 1', 'Idea 2', 'Idea 3')
+EXPECTED_FIXES = (
+    {"file": "utils/logger.py", "line": 45, "fix": "Add log rotation handler."},
+)
+
+_IDEAS_JSON = json.dumps({
+    "research_ideas": [{"description": idea} for idea in EXPECTED_IDEAS]
+}, indent=2)
+
+# Canned create_completion replies keyed by (module, response kind), built once at import
+MOCK_RESPONSES = MappingProxyType({
+    ('idea_generation', 'chat_model'): _IDEAS_JSON,
+    ('idea_generation', 'with_code_blocks'): f"```json\n{_IDEAS_JSON}\n```",
+    ('idea_generation', 'with_extra_text'): f"Here are some ideas:\n{_IDEAS_JSON}\nThat's all for now.",
+    ('idea_generation', 'malformed'): 'This is not a valid JSON response.',
+    # One list of per-criterion scores and one justification object per idea, as the prompt asks
+    ('idea_evaluation', 'chat_model'): json.dumps({
+        "scores": [[8, 7, 9]],
+        "justifications": [{
+            "impact": "Justification 1",
+            "feasibility": "Justification 2",
+            "originality": "Justification 3"
+        }]
+    }),
+    ('experiment_design', 'chat_model'): json.dumps({
+        "experiment_plan": [
+            {"action": "run_python_code", "code": "print('Hello, World!')"}
         ]
-        for logger_name in loggers:
-            logger = logging.getLogger(logger_name)
-            handlers = logger.handlers[:]
-            for handler in handlers:
-                handler.close()
-                logger.removeHandler(handler)
-        
-        # Remove both regular and detailed log files
-        log_file = f'logs/{logger_name}.log'
-        detailed_log_file = f'logs/{logger_name}_detailed.log'
-        for file in [log_file, detailed_log_file]:
+    }),
+    ('feedback_loop', 'chat_model'): json.dumps({
+        "refined_plan": [
+            {"action": "run_python_code", "code": "print('Refined experiment')"},
+            {"action": "use_llm_api", "prompt": "Generate a refined test prompt"}
+        ]
+    }),
+    ('system_augmentation', 'chat_model'): json.dumps([
+        {"file": "utils/constants.py", "code": "VALUE = 1\n"}
+    ]),
+    ('log_error_checker', 'chat_model'): 'Issue 1: Error XYZ\nIssue 2: Warning ABC',
+    ('error_fixing', 'chat_model'): json.dumps({"fixes": list(EXPECTED_FIXES)}),
+})
+
+def _logger_handlers():
+    """(logger, handler) pairs for every handler attached to a logger created so far."""
+    return {
+        (logger, handler)
+        for logger in list(logging.Logger.manager.loggerDict.values())
+        if isinstance(logger, logging.Logger)
+        for handler in logger.handlers
+    }
+
+_handlers_before = set()
+
+def setUpModule():
+    _handlers_before.update(_logger_handlers())
+    # Patched once for the whole module; tests only set COMPLETION_MOCK's return value
+    for module in COMPLETION_MODULES:
+        patcher = patch(f'{module}.create_completion', COMPLETION_MOCK)
+        patcher.start()
+        unittest.addModuleCleanup(patcher.stop)
+    patcher = patch('system_augmentation.acreate_completion', ASYNC_COMPLETION_MOCK)
+    patcher.start()
+    unittest.addModuleCleanup(patcher.stop)
+    # Counting tokens may download tiktoken's encodings; tests that need counts patch their own
+    patcher = patch('utils.openai_utils.count_tokens', return_value=None)
+    patcher.start()
+    unittest.addModuleCleanup(patcher.stop)
+
+def tearDownModule():
+    # Close and remove every logger handler added while the tests ran, to prevent ResourceWarnings
+    for logger, handler in _logger_handlers() - _handlers_before:
+        handler.close()
+        logger.removeHandler(handler)
+
+    # Remove both regular and detailed log files written by the tests, once for the module
+    for logger_name in TEST_LOGGERS:
+        for file in [f'logs/{logger_name}.log', f'logs/{logger_name}_detailed.log']:
             if os.path.exists(file):
                 os.remove(file)
 
-    @patch('idea_generation.create_completion')
-    def test_generate_ideas_chat_model(self, mock_create):
-        # Setup mock response for chat model
-        mock_create.return_value = json.dumps({
-            "research_ideas": [
-                {"description": "Idea 1"},
-                {"description": "Idea 2"},
-                {"description": "Idea 3"}
-            ]
-        })
-        generator = IdeaGenerator('gpt-4', 3)
-        ideas = generator.generate_ideas()
-        self.assertEqual(ideas, ['Idea 1', 'Idea 2', 'Idea 3'])
-
-    @patch('idea_generation.create_completion')
-    def test_generate_ideas_with_code_blocks(self, mock_create):
-        mock_create.return_value = '''```json
-        {
-          "research_ideas": [
-            {"description": "Idea 1"},
-            {"description": "Idea 2"},
-            {"description": "Idea 3"}
-          ]
-        }
-        ```'''
-        generator = IdeaGenerator('gpt-4', 3)
-        ideas = generator.generate_ideas()
-        self.assertEqual(ideas, ['Idea 1', 'Idea 2', 'Idea 3'])
-
-    @patch('idea_generation.create_completion')
-    def test_generate_ideas_with_extra_text(self, mock_create):
-        mock_create.return_value = '''Here are some ideas:
-        {
-          "research_ideas": [
-            {"description": "Idea 1"},
-            {"description": "Idea 2"},
-            {"description": "Idea 3"}
-          ]
-        }
-        That's all for now.'''
-        generator = IdeaGenerator('gpt-4', 3)
-        ideas = generator.generate_ideas()
-        self.assertEqual(ideas, ['Idea 1', 'Idea 2', 'Idea 3'])
-
-    @patch('idea_generation.create_completion')
-    def test_generate_ideas_malformed_response(self, mock_create):
-        mock_create.return_value = 'This is not a valid JSON response.'
-        generator = IdeaGenerator('gpt-4', 3)
-        ideas = generator.generate_ideas()
-        self.assertEqual(ideas, [])
-
-    @patch('idea_evaluation.create_completion')
-    def test_evaluate_ideas_chat_model(self, mock_create):
-        # Setup mock response for chat model
-        mock_create.return_value = json.dumps({
-            "scores": [8, 7, 9],
-            "justifications": {
-                "criterion_1": "Justification 1",
-                "criterion_2": "Justification 2",
-                "criterion_3": "Justification 3"
-            }
-        })
-        evaluator = IdeaEvaluator('gpt-4')
-        scored_ideas = evaluator.evaluate_ideas(['Idea 1'])
+class TestAIResearchSystem(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """
+        Build the components once; every API call they make goes to COMPLETION_MOCK,
+        so they carry no state from one test to the next.
+        """
+        cls.generator = IdeaGenerator('gpt-4', 3)
+        cls.evaluator = IdeaEvaluator('gpt-4')
+        cls.designer = ExperimentDesigner('gpt-4')
+        cls.feedback_loop = FeedbackLoop('gpt-4')
+        cls.checker = LogErrorChecker('gpt-4')
+        cls.fixer = ErrorFixer('gpt-4')
+
+    def setUp(self):
+        COMPLETION_MOCK.reset_mock()
+        COMPLETION_MOCK.return_value = None
+        ASYNC_COMPLETION_MOCK.reset_mock()
+        ASYNC_COMPLETION_MOCK.return_value = None
+        self.mock_create = COMPLETION_MOCK
+
+
+    def _assert_generates_ideas(self, response_shape, expected=EXPECTED_IDEAS):
+        # The idea generator must handle every response shape in MOCK_RESPONSES
+        self.mock_create.return_value = MOCK_RESPONSES[('idea_generation', response_shape)]
+        ideas = self.generator.generate_ideas()
+        self.assertEqual(tuple(ideas), expected)
+
+    def test_generate_ideas_chat_model(self):
+        self._assert_generates_ideas('chat_model')
+
+    def test_generate_ideas_with_code_blocks(self):
+        self._assert_generates_ideas('with_code_blocks')
+
+    def test_generate_ideas_with_extra_text(self):
+        self._assert_generates_ideas('with_extra_text')
+
+    def test_generate_ideas_malformed_response(self):
+        self._assert_generates_ideas('malformed', expected=())
+
+    def test_extract_json_from_text(self):
+        text = 'Plan {draft} follows: {"plan": {"note": "use } and { freely"}, "steps": [1, 2]} Done {}'
+        self.assertEqual(extract_json_from_text(text), {"plan": {"note": "use } and { freely"}, "steps": [1, 2]})
+        self.assertIsNone(extract_json_from_text('No JSON {here} at all'))
+
+    def test_evaluate_ideas_chat_model(self):
+        self.mock_create.return_value = MOCK_RESPONSES[('idea_evaluation', 'chat_model')]
+        scored_ideas = self.evaluator.evaluate_ideas(['Idea 1'])
         self.assertEqual(len(scored_ideas), 1)
         self.assertEqual(scored_ideas[0]['score'], 24)  # 8 + 7 + 9
         self.assertEqual(len(scored_ideas[0]['justifications']), 3)
 
-    @patch('experiment_design.create_completion')
-    def test_design_experiment_chat_model(self, mock_create):
-        # Setup mock response for chat model
-        mock_create.return_value = json.dumps({
-            "experiment_plan": [
-                {"action": "run_python_code", "code": "print('Hello, World!')"}
-            ]
-        })
-        designer = ExperimentDesigner('gpt-4')
-        experiment_plan = designer.design_experiment("Test idea")
+    def test_design_experiment_chat_model(self):
+        self.mock_create.return_value = MOCK_RESPONSES[('experiment_design', 'chat_model')]
+        experiment_plan = self.designer.design_experiment("Test idea")
         self.assertEqual(len(experiment_plan), 1)
         self.assertEqual(experiment_plan[0]['action'], "run_python_code")
 
-    @patch('feedback_loop.create_completion')
-    def test_refine_experiment_chat_model(self, mock_create):
-        # Setup mock response for chat model
-        mock_create.return_value = json.dumps({
-            "refined_plan": [
-                {"action": "run_python_code", "code": "print('Refined experiment')"},
-                {"action": "use_llm_api", "prompt": "Generate a refined test prompt"}
-            ]
-        })
-        feedback_loop = FeedbackLoop('gpt-4')
+    def test_refine_experiment_chat_model(self):
+        self.mock_create.return_value = MOCK_RESPONSES[('feedback_loop', 'chat_model')]
         initial_plan = [{"action": "run_python_code", "code": "print('Initial experiment')"}]
-        refined_plan = feedback_loop.refine_experiment(initial_plan, "Initial results")
+        refined_plan = self.feedback_loop.refine_experiment(initial_plan, "Initial results")
         self.assertEqual(len(refined_plan), 2)
         self.assertEqual(refined_plan[0]['action'], "run_python_code")
         self.assertEqual(refined_plan[1]['action'], "use_llm_api")
@@ -149,6 +213,7 @@ class TestAIResearchSystem(unittest.TestCase):
         mock_validate.return_value = True
         mock_run_tests.return_value = True
         mock_evaluate.return_value = True
+        self.mock_create.return_value = MOCK_RESPONSES[('system_augmentation', 'chat_model')]
         
         augmentor = SystemAugmentor()
         augmentor.augment_system({})
@@ -158,22 +223,360 @@ class TestAIResearchSystem(unittest.TestCase):
         self.assertTrue(mock_run_tests.called)
         self.assertTrue(mock_evaluate.called)
 
-    @patch('log_error_checker.create_completion')
-    def test_log_error_checker_chat_model(self, mock_create):
-        # Setup mock response for chat model
-        mock_create.return_value = 'Issue 1: Error XYZ\nIssue 2: Warning ABC'
-        checker = LogErrorChecker('gpt-4')
-        analysis = checker.check_logs('logs/main.log')
-        self.assertEqual(analysis, 'Issue 1: Error XYZ\nIssue 2: Warning ABC')
-
-    @patch('error_fixing.create_completion')
-    def test_error_fixing_chat_model(self, mock_create):
-        # Setup mock response for chat model
-        mock_create.return_value = 'File: utils/logger.py\nLine 45: Add log rotation handler.'
-        fixer = ErrorFixer('gpt-4')
+    def test_grade_items_normalises_mean_score(self):
+        ASYNC_COMPLETION_MOCK.return_value = json.dumps({"scores": [8, 6]})
+        augmentor = SystemAugmentor()
+        score = run_async(augmentor._grade_items("Rate these ideas", "novelty", ["Idea 1", "Idea 2"]))
+        self.assertAlmostEqual(score, 0.7)
+        self.assertEqual(ASYNC_COMPLETION_MOCK.await_count, 1)
+
+    def test_failed_benchmark_scores_zero_without_stopping_the_others(self):
+        augmentor = SystemAugmentor()
+        with patch.object(SystemAugmentor, '_grade_items', AsyncMock(return_value=0.5)), \
+                patch.object(SystemAugmentor, '_benchmark_coding_task', side_effect=ZeroDivisionError):
+            metrics = augmentor._run_benchmarks().get_all()
+        self.assertEqual(metrics['coding_task_performance'], 0.0)
+        self.assertEqual(metrics['report_quality'], 0.5)
+
+    def test_create_completion_stream_yields_deltas(self):
+        chunks = [
+            MagicMock(choices=[MagicMock(delta=MagicMock(content=delta))])
+            for delta in ['{"a"', None, ': 1}']
+        ]
+        with patch('utils.openai_utils.client') as mock_client, \
+                patch('utils.openai_utils._rate_limit_wait', return_value=0.0) as mock_wait:
+            mock_client.chat.completions.create.return_value = iter(chunks)
+            pieces = list(create_completion_stream('gpt-4', [{"role": "user", "content": "stream"}]))
+        self.assertEqual(pieces, ['{"a"', ': 1}'])
+        self.assertEqual(mock_wait.call_count, 1)  # Paced like any other request
+        self.assertTrue(mock_client.chat.completions.create.call_args.kwargs['stream'])
+
+    def test_create_completion_stream_fails_over_to_next_endpoint(self):
+        failing, healthy = MagicMock(), MagicMock()
+        failing.chat.completions.create.side_effect = openai.APIConnectionError(request=MagicMock())
+        healthy.chat.completions.create.return_value = iter([MagicMock(choices=[MagicMock(delta=MagicMock(content='ok'))])])
+        pool = ClientPool([failing, healthy], cool_down=60)
+        with patch('utils.openai_utils.client_pool', pool), \
+                patch('utils.openai_utils._open_completion_stream.retry.wait', return_value=0):
+            pieces = list(create_completion_stream('gpt-4', [{"role": "user", "content": "failover"}]))
+        self.assertEqual(pieces, ['ok'])
+        self.assertEqual(pool.get(), healthy)  # The failing endpoint is cooling down
+
+    def test_client_pool_skips_endpoints_cooling_down(self):
+        pool = ClientPool(['a', 'b', 'c'], cool_down=60)
+        self.assertEqual([pool.get() for _ in range(4)], ['a', 'b', 'c', 'a'])
+        pool.record_failure('b', openai.APIConnectionError(request=MagicMock()))
+        self.assertEqual([pool.get() for _ in range(3)], ['c', 'a', 'c'])
+        for client in ['a', 'c']:
+            pool.record_failure(client, openai.APIConnectionError(request=MagicMock()))
+        self.assertEqual(pool.get(), 'b')  # Recovers first
+
+    def test_only_requests_on_this_account_are_paced(self):
+        response = MagicMock(choices=[MagicMock(message=MagicMock(content='Paced'))])
+        messages = [{"role": "user", "content": "Grade this"}]
+        local_grader = MagicMock()
+        local_grader.chat.completions.create = AsyncMock(return_value=response)
+        with patch('utils.openai_utils.async_client') as mock_async_client, \
+                patch('utils.openai_utils._rate_limit_wait', return_value=0.0) as mock_wait:
+            mock_async_client.chat.completions.create = AsyncMock(return_value=response)
+            run_async(acreate_completion('gpt-4', messages, client=mock_async_client))
+            self.assertEqual(mock_wait.call_count, 1)
+            run_async(acreate_completion('gpt-4', messages, client=local_grader))
+            self.assertEqual(mock_wait.call_count, 1)
+
+    def test_token_bucket_waits_once_burst_is_spent(self):
+        bucket = TokenBucket(rate=10, capacity=20)
+        with patch('utils.openai_utils.time.monotonic', return_value=100.0):
+            bucket._updated = 100.0
+            self.assertEqual(bucket.reserve(15), 0.0)
+            self.assertAlmostEqual(bucket.reserve(10), 0.5)  # 5 short at 10 tokens/s
+            self.assertAlmostEqual(bucket.reserve(10), 1.5)  # Queued behind the previous caller
+        with patch('utils.openai_utils.time.monotonic', return_value=103.0):
+            self.assertEqual(bucket.reserve(10), 0.0)
+
+    def test_count_tokens_gives_up_once_when_encoding_cannot_load(self):
+        tiktoken = MagicMock()
+        tiktoken.encoding_for_model.side_effect = OSError("Couldn't download the encoding")
+        messages = [{"role": "user", "content": "Offline"}]
+        with patch('utils.openai_utils.TIKTOKEN_AVAILABLE', True), patch.dict(sys.modules, {'tiktoken': tiktoken}):
+            self.assertIsNone(count_tokens('offline-model', messages))
+            self.assertIsNone(count_tokens('offline-model', messages))
+        self.assertEqual(tiktoken.encoding_for_model.call_count, 1)
+
+    def test_fit_max_tokens_clamps_to_context_window(self):
+        messages = [{"role": "user", "content": "Long prompt"}]
+        with patch('utils.openai_utils.count_tokens', return_value=6000):
+            self.assertEqual(fit_max_tokens('gpt-4', messages, 1000), 1000)
+            self.assertEqual(fit_max_tokens('gpt-4-0613', messages, 4000), 8192 - 6000 - 16)
+            self.assertEqual(fit_max_tokens('gpt-4o', messages, 4000), 4000)
+            self.assertEqual(fit_max_tokens('unknown-model', messages, 4000), 4000)
+        with patch('utils.openai_utils.count_tokens', return_value=9000):
+            with self.assertRaises(TokenBudgetError):
+                fit_max_tokens('gpt-4', messages, 4000)
+
+    def test_normalize_messages_puts_system_prompt_first(self):
+        messages = [
+            {"role": "system", "content": "Be concise."},
+            {"role": "user", "content": "Hi", "name": None},
+            {"role": "system", "content": "Answer in JSON."},
+        ]
+        self.assertEqual(normalize_messages(messages), [
+            {"role": "system", "content": "Be concise.\n\nAnswer in JSON."},
+            {"role": "user", "content": "Hi"},
+        ])
+        plain = [{"role": "system", "content": "Be concise."}, {"role": "user", "content": "Hi"}]
+        self.assertEqual(normalize_messages(plain), plain)
+
+    @patch('utils.openai_utils.llm_cache')
+    def test_identical_requests_in_flight_are_sent_once(self, mock_cache):
+        mock_cache.get.return_value = None
+        messages = [{"role": "user", "content": "coalesce"}]
+        reply = MagicMock(choices=[MagicMock(message=MagicMock(content='reply'))])
+
+        def slow_create(**kwargs):
+            time.sleep(0.05)
+            return reply
+
+        with patch('utils.openai_utils.client') as mock_client:
+            mock_client.chat.completions.create.side_effect = slow_create
+            with ThreadPoolExecutor(3) as executor:
+                replies = list(executor.map(lambda _: create_completion('gpt-4', messages, temperature=0), range(3)))
+        self.assertEqual(replies, ['reply'] * 3)
+        self.assertEqual(mock_client.chat.completions.create.call_count, 1)
+
+        async def slow_acreate(**kwargs):
+            await asyncio.sleep(0.05)
+            return reply
+
+        async def complete_concurrently():
+            return await asyncio.gather(*(acreate_completion('gpt-4', messages, temperature=0) for _ in range(3)))
+
+        with patch('utils.openai_utils.async_client') as mock_async_client:
+            mock_async_client.chat.completions.create.side_effect = slow_acreate
+            self.assertEqual(run_async(complete_concurrently()), ['reply'] * 3)
+        self.assertEqual(mock_async_client.chat.completions.create.call_count, 1)
+
+    def test_create_completions_batch_keeps_order(self):
+        async def complete(model, messages, **kwargs):
+            content = messages[-1]['content']
+            if content == 'fail':
+                raise ValueError(content)
+            await asyncio.sleep(0.01 if content == 'slow' else 0)
+            return content.upper()
+
+        with patch('utils.openai_utils.acreate_completion', side_effect=complete) as mock_complete:
+            messages_list = [[{"role": "user", "content": content}] for content in ['slow', 'fail', 'fast']]
+            self.assertEqual(create_completions_batch('gpt-4', messages_list, concurrency=2), ['SLOW', None, 'FAST'])
+        self.assertEqual(mock_complete.call_count, 3)
+
+    def test_run_with_checkpoint_skips_finished_tasks(self):
+        tasks = [{'id': task_id, 'args': {'model': 'gpt-4', 'messages': [{"role": "user", "content": task_id}]}}
+                 for task_id in ['t1', 't2', 't3']]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            output_jsonl = os.path.join(temp_dir, 'results.jsonl')
+            with open(output_jsonl, 'w') as f:
+                f.write('{"id": "t1", "content": "done before"}\n{"id": "t2", "cont')  # Cut short by a crash
+            with patch('utils.openai_utils.create_completion', side_effect=lambda model, messages: messages[0]['content'].upper()) as mock_create:
+                results = run_with_checkpoint(tasks, output_jsonl)
+                self.assertEqual(results, {'t1': 'done before', 't2': 'T2', 't3': 'T3'})
+                self.assertEqual(mock_create.call_count, 2)
+                # Resuming again finds every task finished
+                self.assertEqual(run_with_checkpoint(tasks, output_jsonl), results)
+                self.assertEqual(mock_create.call_count, 2)
+            with open(output_jsonl, 'rb') as f:
+                self.assertEqual([json.loads(line)['id'] for line in f], ['t1', 't2', 't3'])
+
+    def test_create_completion_batch_job_matches_results_by_custom_id(self):
+        results = [
+            {"custom_id": "req-1", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "B"}}]}}},
+            {"custom_id": "req-0", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "A"}}]}}},
+            {"custom_id": "req-2", "response": {"status_code": 500, "body": {}}},
+        ]
+        with patch('utils.openai_utils.client') as mock_client:
+            mock_client.batches.create.return_value = MagicMock(id='batch-1', status='in_progress')
+            mock_client.batches.retrieve.return_value = MagicMock(id='batch-1', status='completed', output_file_id='file-out')
+            mock_client.files.content.return_value.text = '\n'.join(json.dumps(result) for result in results)
+            messages_list = [[{"role": "user", "content": prompt}] for prompt in 'abc']
+            contents = create_completion_batch_job('gpt-4', messages_list, poll_interval=0)
+        self.assertEqual(contents, ['A', 'B', None])
+        _, upload = mock_client.files.create.call_args.kwargs['file']
+        self.assertEqual([json.loads(line)['custom_id'] for line in upload.splitlines()], ['req-0', 'req-1', 'req-2'])
+        mock_client.files.content.assert_called_once_with('file-out')
+
+    def test_wait_for_rate_limit_honours_retry_after(self):
+        def retry_state(headers):
+            state = MagicMock(attempt_number=1)
+            response = MagicMock(headers=headers)
+            state.outcome.exception.return_value = openai.RateLimitError('Rate limited', response=response, body=None)
+            return state
+
+        self.assertEqual(wait_for_rate_limit(retry_state({'retry-after': '3'})), 3)
+        self.assertEqual(wait_for_rate_limit(retry_state({'retry-after-ms': '250'})), 0.25)
+        self.assertEqual(wait_for_rate_limit(retry_state({'retry-after': '600'})), 60)
+        self.assertLessEqual(wait_for_rate_limit(retry_state({})), 60)
+
+    def test_validate_modifications_unsafe_calls(self):
+        augmentor = SystemAugmentor()
+        # Mentions in comments and strings are not calls
+        safe_code = '# never call os.system here\nmessage = "eval is disabled"\nprint(message)\n'
+        self.assertTrue(augmentor._validate_modifications([('utils/constants.py', safe_code)]))
+        self.assertFalse(augmentor._validate_modifications([('utils/constants.py', 'import os\nos.system("ls")\n')]))
+        self.assertFalse(augmentor._validate_modifications([('utils/constants.py', 'eval("1 + 1")\n')]))
+        # Spellings the parser accepts as os.system(...) must not slip past the prefilter
+        self.assertFalse(augmentor._validate_modifications([('utils/constants.py', 'import os\n(os).system("x")\n')]))
+        self.assertFalse(augmentor._validate_modifications([('utils/constants.py', 'import os\nos.\\\n    system("x")\n')]))
+
+    def test_validate_modifications_returns_patch_plan(self):
+        augmentor = SystemAugmentor()
+        code = 'VALUE = 1\n'
+        patch_plan = augmentor._validate_modifications([('utils/constants.py', code)])
+        self.assertEqual(patch_plan, [('utils/constants.py', code)])
+        self.assertEqual(augmentor._validate_modifications([('utils/constants.py', 'VALUE = (\n')]), [])
+
+    def test_run_tests_fails_when_no_tests_are_discovered(self):
+        augmentor = SystemAugmentor()
+        no_tests = subprocess.CompletedProcess([], 0, stdout='', stderr='\nRan 0 tests in 0.000s\n\nOK\n')
+        with patch('system_augmentation.subprocess.run', return_value=no_tests) as mock_run:
+            self.assertFalse(augmentor._run_tests())
+        self.assertEqual(mock_run.call_args.args[0], augmentor._test_command())
+
+    def test_revert_changes_restores_modified_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            backup_store = os.path.join(temp_dir, '.sysaug')
+            # A run that crashed before reverting leaves its manifest behind; later runs must not restore it
+            stale_path = os.path.join(temp_dir, 'stale.py')
+            with open(stale_path, 'w') as f:
+                f.write('stale = True\n')
+            SystemAugmentor(backup_store=backup_store)._modify_file(stale_path, 'kept = True\n')
+            augmentor = SystemAugmentor(backup_store=backup_store)
+            file_path = os.path.join(temp_dir, 'module.py')
+            with open(file_path, 'w') as f:
+                f.write('original = True\n')
+            augmentor._modify_file(file_path, 'first = True\n')
+            augmentor._modify_file(file_path, 'second = True\n')
+            augmentor._revert_changes()
+            with open(file_path) as f:
+                self.assertEqual(f.read(), 'original = True\n')
+            # Writing to the restored file in place must leave the stored original intact
+            with open(file_path, 'r+') as f:
+                f.write('ORIGINAL = True\n')
+            augmentor._modify_file(file_path, 'third = True\n')
+            augmentor._revert_changes()
+            with open(file_path) as f:
+                self.assertEqual(f.read(), 'ORIGINAL = True\n')
+            for digest in os.listdir(os.path.join(backup_store, 'objects')):
+                self.assertEqual(os.stat(os.path.join(backup_store, 'objects', digest)).st_nlink, 1)
+            with open(stale_path) as f:
+                self.assertEqual(f.read(), 'kept = True\n')
+            self.assertEqual(sorted(os.listdir(temp_dir)), ['.sysaug', 'module.py', 'stale.py'])
+            self.assertFalse(os.path.exists(augmentor._manifest_path()))
+
+    def test_loggers_share_one_listener_thread(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            threads_before = threading.active_count()
+            loggers = [setup_logger(f'shared_listener_{i}', os.path.join(temp_dir, f'{i}.log')) for i in range(3)]
+            self.assertEqual(threading.active_count(), threads_before)
+            for i, logger in enumerate(loggers):
+                logger.info('record %d', i)
+                handler = logger.handlers[-1]
+                logger.removeHandler(handler)
+                handler.close()  # Drains the queue before closing the file
+                with open(os.path.join(temp_dir, f'{i}.log')) as f:
+                    self.assertIn(f'shared_listener_{i} - INFO - record {i}', f.read())
+
+    def test_parse_llm_response_caches_only_short_replies(self):
+        _find_short_json_text.cache_clear()
+        self.assertEqual(parse_llm_response('Result: {"a": 1}'), {"a": 1})
+        self.assertEqual(parse_llm_response('Result: ' + 'x' * 5000 + ' {"a": 2}'), {"a": 2})
+        self.assertEqual(_find_short_json_text.cache_info().currsize, 1)
+
+    def test_backup_and_restore_code(self):
+        with tempfile.TemporaryDirectory() as source_dir, tempfile.TemporaryDirectory() as backup_dir:
+            os.makedirs(os.path.join(source_dir, 'utils'))
+            for name, content in [('main.py', 'main'), ('utils/helper.py', 'helper'), ('readme.txt', 'notes')]:
+                with open(os.path.join(source_dir, name), 'w') as f:
+                    f.write(content)
+            backup_path = backup_code(source_dir, backup_dir)
+            self.assertEqual(sorted(os.listdir(backup_path)), ['main.py', 'utils'])
+
+            # Rewriting a source file in place must not change its backup
+            with open(os.path.join(source_dir, 'main.py'), 'r+') as f:
+                f.write('edit')
+            with open(os.path.join(backup_path, 'main.py')) as f:
+                self.assertEqual(f.read(), 'main')
+
+            os.remove(os.path.join(source_dir, 'utils/helper.py'))
+            with open(os.path.join(source_dir, 'added.py'), 'w') as f:
+                f.write('added')
+            restore_code(backup_path, source_dir)
+            self.assertEqual(sorted(os.listdir(source_dir)), ['main.py', 'readme.txt', 'utils'])
+            with open(os.path.join(source_dir, 'utils/helper.py')) as f:
+                self.assertEqual(f.read(), 'helper')
+
+    def test_llm_cache_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache = LLMCache(os.path.join(temp_dir, 'completions.sqlite'), max_entries=2)
+            keys = [LLMCache.key('gpt-4', [{"role": "user", "content": prompt}], temperature=0) for prompt in 'abc']
+            self.assertEqual(len(set(keys)), 3)
+            self.assertIsNone(cache.get(keys[0]))
+            cache.set(keys[0], 'reply a')
+            cache.set(keys[1], 'reply b')
+            self.assertEqual(cache.get(keys[0]), 'reply a')  # Now more recent than b
+            cache.set(keys[2], 'reply c')
+            self.assertEqual(cache.get(keys[0]), 'reply a')
+            self.assertIsNone(cache.get(keys[1]))
+            self.assertEqual(cache.get(keys[2]), 'reply c')
+            self.assertEqual((cache.hits, cache.misses), (3, 2))
+            cache._conn.close()
+
+    def test_semantic_cache_matches_paraphrases(self):
+        embeddings = {
+            "What is the capital of France?": [1.0, 0.1, 0.0],
+            "France's capital?": [0.9, 0.1, 0.0],
+            "How tall is Everest?": [0.0, 0.2, 1.0],
+        }
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, 'semantic.sqlite')
+            cache = SemanticCache(embeddings.get, path)
+            cached, vector = cache.lookup('gpt-4', "What is the capital of France?")
+            self.assertIsNone(cached)
+            cache.add('gpt-4', vector, 'Paris')
+            self.assertEqual(cache.lookup('gpt-4', "France's capital?")[0], 'Paris')
+            self.assertIsNone(cache.lookup('gpt-4', "How tall is Everest?")[0])
+            self.assertIsNone(cache.lookup('gpt-4o', "France's capital?")[0])
+            cache._conn.close()
+            # Entries persist across instances
+            reloaded = SemanticCache(embeddings.get, path)
+            self.assertEqual(reloaded.lookup('gpt-4', "France's capital?")[0], 'Paris')
+            reloaded._conn.close()
+
+    def test_research_history_recent(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            history = ResearchHistory(temp_dir)
+            self.assertEqual(history.recent_payloads('idea', 2), [])
+            for idea in ['Idea 1', 'Idea 2', 'Idea 3']:
+                history.record('idea', idea)
+            history.record('error_fix', 'Issue 1', success=True)
+            self.assertEqual(history.recent_payloads('idea', 2), ['Idea 2', 'Idea 3'])
+            history.record('idea', 'Idea 4')
+            self.assertEqual(history.recent_payloads('idea', 2), ['Idea 3', 'Idea 4'])
+            self.assertEqual(history.recent('error_fix', 5, columns=('success',)), [{'success': True}])
+
+    def test_log_error_checker_chat_model(self):
+        self.mock_create.return_value = MOCK_RESPONSES[('log_error_checker', 'chat_model')]
+        # Serve the log from memory, so the test neither touches nor shares logs/main.log
+        log_contents = 'ERROR: Error XYZ\nWARNING: Warning ABC\n'
+        with patch('log_error_checker.open', mock_open(read_data=log_contents), create=True) as mocked_open:
+            analysis = self.checker.check_logs('logs/main.log')
+        mocked_open.assert_called_once_with('logs/main.log', 'r')
+        self.assertIn(log_contents, self.mock_create.call_args.kwargs['messages'][1]['content'])
+        self.assertEqual(analysis, MOCK_RESPONSES[('log_error_checker', 'chat_model')])
+
+    def test_error_fixing_chat_model(self):
+        self.mock_create.return_value = MOCK_RESPONSES[('error_fixing', 'chat_model')]
         with patch.object(ErrorFixer, 'apply_code_fixes') as mock_apply:
-            fixer.fix_errors('Issue 1: Error XYZ\nIssue 2: Warning ABC')
-            mock_apply.assert_called_once_with('File: utils/logger.py\nLine 45: Add log rotation handler.')
+            self.fixer.fix_errors('Issue 1: Error XYZ\nIssue 2: Warning ABC')
+            mock_apply.assert_called_once_with(list(EXPECTED_FIXES))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
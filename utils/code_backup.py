@@ -2,55 +2,106 @@
 
 import shutil
 import os
-import datetime
+import re
+import sys
+import fnmatch
+import time
+from concurrent.futures import ThreadPoolExecutor
 from utils.logger import setup_logger
 
+try:
+    import fcntl
+except ImportError:  # Windows; backups are plain copies there
+    fcntl = None
+
 logger = setup_logger('code_backup', 'logs/code_backup.log')
 
+RESTORE_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+# Files and directories left out of backups
+IGNORE_PATTERNS = [
+    '*.pyc', '__pycache__', 'logs', 'reports', 'code_backups', '.sysaug', 'history', '.llm_cache', '*.log', '*.txt', '.git', '.idea', 'venv', '*.md'
+]
+# All patterns in one regex, so each name is matched once instead of once per pattern
+_IGNORE_RE = re.compile('|'.join(fnmatch.translate(pattern) for pattern in IGNORE_PATTERNS))
+
+# Top-level items restore_code leaves untouched
+RESTORE_PRESERVE = frozenset([
+    '.git', 'code_backups', '.sysaug', 'history', '.llm_cache', 'logs', 'reports', 'venv', 'requirements.txt', 'readme.txt'
+])
+
+def _ignored_names(directory, names):
+    return {name for name in names if _IGNORE_RE.match(os.path.normcase(name))}
+
+# Linux ioctl that makes dst a copy-on-write clone of src (btrfs, XFS with reflink, ...)
+_FICLONE = 0x40049409
+
+def _clone_or_copy(src, dst):
+    # A clone shares no data with the live file once either is written, so unlike a hard link
+    # it stays a true backup even when the file is rewritten in place; on other filesystems it's a copy
+    if fcntl is not None and sys.platform.startswith('linux'):
+        try:
+            with open(src, 'rb') as source, open(dst, 'wb') as target:
+                fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+            shutil.copystat(src, dst)
+            return dst
+        except OSError:
+            pass  # Not supported by this filesystem, or src and dst are on different ones
+    return shutil.copy2(src, dst)
+
 def backup_code(source_dir, backup_dir):
     """
     Backs up the code to the backup directory with a timestamp.
+    Files are cloned copy-on-write where the filesystem supports it, so no data is copied until
+    they diverge, and copied otherwise.
     """
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
     backup_path = os.path.join(backup_dir, f'backup_{timestamp}')
     try:
         # Ignore certain directories and files
         shutil.copytree(
             source_dir, backup_path, dirs_exist_ok=True,
-            ignore=shutil.ignore_patterns(
-                '*.pyc', '__pycache__', 'logs', 'reports', 'code_backups', '*.log', '*.txt', '.git', '.idea', 'venv', '*.md'
-            )
+            ignore=_ignored_names,
+            copy_function=_clone_or_copy
         )
         return backup_path
     except Exception as e:
         logger.error(f"Error backing up code: {e}")
         return None
 
+# Both take os.DirEntry objects, whose type checks reuse the scandir result instead of calling stat()
+def _remove_entry(entry):
+    if entry.is_dir(follow_symlinks=False):
+        shutil.rmtree(entry.path)
+    else:
+        os.remove(entry.path)  # Files and symlinks
+
+def _copy_entry(entry, source_dir):
+    # shutil.copy keeps permission bits but not timestamps or xattrs; restored files
+    # get fresh mtimes, which also invalidates any bytecode cached from the replaced code
+    destination = os.path.join(source_dir, entry.name)
+    if entry.is_dir():
+        shutil.copytree(entry.path, destination, dirs_exist_ok=True, copy_function=shutil.copy)
+    else:
+        shutil.copy(entry.path, destination)
+
 def restore_code(backup_path, source_dir):
     """
     Restores the code from the backup directory while preserving .git and other important files/directories.
     """
     try:
-        # List of items to preserve
-        preserve = ['.git', 'code_backups', 'logs', 'reports', 'venv', 'requirements.txt', 'readme.txt']
-
-        # Remove current code except preserved items
-        for item in os.listdir(source_dir):
-            if item not in preserve:
-                item_path = os.path.join(source_dir, item)
-                if os.path.isfile(item_path):
-                    os.remove(item_path)
-                elif os.path.isdir(item_path):
-                    shutil.rmtree(item_path)
-
-        # Copy backup code to source directory
-        for item in os.listdir(backup_path):
-            s = os.path.join(backup_path, item)
-            d = os.path.join(source_dir, item)
-            if item not in preserve:
-                if os.path.isdir(s):
-                    shutil.copytree(s, d, dirs_exist_ok=True)
-                else:
-                    shutil.copy2(s, d)
+        # Top-level items are removed and copied on a thread pool; the work is
+        # filesystem syscalls, which release the GIL
+        with ThreadPoolExecutor(max_workers=RESTORE_WORKERS) as executor:
+            # Remove current code except preserved items
+            with os.scandir(source_dir) as entries:
+                list(executor.map(_remove_entry, [entry for entry in entries if entry.name not in RESTORE_PRESERVE]))
+
+            # Copy backup code to source directory
+            with os.scandir(backup_path) as entries:
+                list(executor.map(
+                    lambda entry: _copy_entry(entry, source_dir),
+                    [entry for entry in entries if entry.name not in RESTORE_PRESERVE]
+                ))
     except Exception as e:
         logger.error(f"Error restoring code: {e}")
@@ -1,6 +1,7 @@
 # utils/config.py
 
 import os
+import json
 import logging
 import openai
 from openai import OpenAI
@@ -17,8 +18,8 @@ def is_openai_initialized():
 
 def initialize_openai():
     global _openai_initialized
+    # Every component calls this from its constructor; after the first call it's a flag check
     if _openai_initialized:
-        logger.info("OpenAI client already initialized.")
         return
 
     api_key = os.getenv("OPENAI_API_KEY")
@@ -32,3 +33,22 @@ def initialize_openai():
 # Add more configuration options as needed
 MODEL_TEMPERATURE = float(os.getenv('MODEL_TEMPERATURE', 0.7))
 MAX_TOKENS = int(os.getenv('MAX_TOKENS', 3500))
+# Model used to grade benchmark outputs. Rubric scoring doesn't need the main model,
+# so this defaults to a small one; GRADER_BASE_URL can point it at a local
+# OpenAI-compatible server instead (e.g. vLLM serving an FP8-quantized model).
+GRADER_MODEL = os.getenv('GRADER_MODEL', 'gpt-4o-mini')
+GRADER_BASE_URL = os.getenv('GRADER_BASE_URL')
+# Completions can be spread over several OpenAI-compatible endpoints, e.g. extra API keys or
+# mirrors serving the same models, as a JSON list of {"base_url": ..., "api_key": ...} objects
+OPENAI_ENDPOINTS = json.loads(os.getenv('OPENAI_ENDPOINTS') or '[]')
+# Account limits in requests and tokens per minute; requests are paced to stay under them
+# instead of bursting into 429s. 0 leaves that limit unenforced
+RATE_LIMIT_RPM = int(os.getenv('RATE_LIMIT_RPM', 0))
+RATE_LIMIT_TPM = int(os.getenv('RATE_LIMIT_TPM', 0))
+# Completions at temperature 0 are always served from utils.llm_cache when possible;
+# LLM_CACHE=1 replays sampled ones too, which is handy while iterating on the pipeline
+LLM_CACHE = os.getenv('LLM_CACHE') == '1'
+# SEMANTIC_CACHE=1 also answers low-temperature completions whose last message is a close
+# paraphrase of an earlier one (same model and preceding messages), matched by embedding
+SEMANTIC_CACHE = os.getenv('SEMANTIC_CACHE') == '1'
+EMBEDDING_MODEL = os.getenv('EMBEDDING_MODEL', 'text-embedding-3-small')
@@ -1,5 +1,29 @@
+import re
+from functools import lru_cache
+
 chat_models = [
     'gpt-3.5-turbo', 'gpt-4', 'gpt-4-0314', 'gpt-4-32k', 
     'gpt-3.5-turbo-0301', 'gpt-4o', 'gpt-4o-mini', 
     'o1-preview', 'o1-mini'
 ]
+# Lowercased, as a tuple for a single str.startswith() check against a model name
+CHAT_MODEL_PREFIXES = tuple(model.lower() for model in chat_models)
+
+@lru_cache(maxsize=None)
+def is_chat_model(model_name):
+    return model_name.lower().startswith(CHAT_MODEL_PREFIXES)
+
+# Context window (prompt + completion tokens) per model; dated snapshots share their base model's
+CONTEXT_WINDOWS = {
+    'gpt-3.5-turbo': 16385, 'gpt-3.5-turbo-0301': 4096, 'gpt-3.5-turbo-0613': 4096,
+    'gpt-4': 8192, 'gpt-4-32k': 32768, 'gpt-4-turbo': 128000,
+    'gpt-4o': 128000, 'gpt-4o-mini': 128000,
+    'o1-preview': 128000, 'o1-mini': 128000,
+}
+_SNAPSHOT_SUFFIX_RE = re.compile(r'-(\d{4}|\d{4}-\d{2}-\d{2})$')
+
+@lru_cache(maxsize=None)
+def context_window(model_name):
+    """Returns the model's context window in tokens, or None for models not listed."""
+    name = model_name.lower()
+    return CONTEXT_WINDOWS.get(name) or CONTEXT_WINDOWS.get(_SNAPSHOT_SUFFIX_RE.sub('', name))
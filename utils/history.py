@@ -0,0 +1,72 @@
+# utils/history.py
+
+import os
+import json
+import time
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from utils.logger import setup_logger
+
+logger = setup_logger('history', 'logs/history.log')
+
+HISTORY_DIR = 'history'
+
+# One row per recorded item; payloads are kept as JSON text so every kind shares a schema
+HISTORY_SCHEMA = pa.schema([
+    ('ts', pa.float64()),
+    ('kind', pa.string()),
+    ('payload_json', pa.string()),
+    ('score', pa.float64()),
+    ('success', pa.bool_()),
+    ('duration_s', pa.float64()),
+])
+
+class ResearchHistory:
+    """
+    Columnar, append-only record of what the system produced (ideas, designs, reports, ...).
+
+    Each record() writes a small Parquet file into history_dir, and reads only load the
+    requested columns of one kind. Results are cached until the next write.
+    """
+    def __init__(self, history_dir=HISTORY_DIR):
+        self.history_dir = history_dir
+        self._cache = {}
+
+    def record(self, kind, payload=None, score=None, success=None, duration_s=None):
+        try:
+            os.makedirs(self.history_dir, exist_ok=True)
+            row = {
+                'ts': [time.time()],
+                'kind': [kind],
+                'payload_json': [json.dumps(payload, default=str)],
+                'score': [score],
+                'success': [success],
+                'duration_s': [duration_s],
+            }
+            table = pa.Table.from_pydict(row, schema=HISTORY_SCHEMA)
+            pq.write_table(table, os.path.join(self.history_dir, f"{time.time_ns()}_{kind}.parquet"))
+            self._cache.clear()
+        except Exception as e:
+            logger.error(f"Error recording {kind} history: {e}")
+
+    def recent(self, kind, n, columns=('payload_json',)):
+        """
+        Returns the last n rows of the given kind, oldest first, as dicts of the requested columns.
+        """
+        key = (kind, n, tuple(columns))
+        if key not in self._cache:
+            self._cache[key] = self._read_recent(kind, n, list(columns))
+        return self._cache[key]
+
+    def recent_payloads(self, kind, n):
+        return [json.loads(row['payload_json']) for row in self.recent(kind, n)]
+
+    def _read_recent(self, kind, n, columns):
+        if not os.path.isdir(self.history_dir):
+            return []
+        dataset = ds.dataset(self.history_dir, format='parquet', schema=HISTORY_SCHEMA)
+        table = dataset.to_table(columns=['ts'] + columns, filter=ds.field('kind') == kind)
+        table = table.sort_by('ts')
+        table = table.slice(max(table.num_rows - n, 0))
+        return table.select(columns).to_pylist()
@@ -1,5 +1,6 @@
 import json
-import re
+import orjson
+from functools import lru_cache
 from utils.logger import setup_logger
 import logging
 from logging.handlers import RotatingFileHandler
@@ -7,27 +8,80 @@ from logging.handlers import RotatingFileHandler
 # Update the logger setup
 logger = setup_logger('json_utils', 'logs/json_utils.log', log_rotation=True)
 
+# orjson decodes whole replies; the stdlib decoder is kept for raw_decode, which orjson lacks
+_decoder = json.JSONDecoder()
+
 def parse_llm_response(response):
     """
     Attempt to parse the LLM response as JSON.
+    Markdown code fences are stripped, and a JSON object surrounded by other text is still found.
     """
+    # create_completion returns the reply text, so check for that before probing for a raw API response
+    if isinstance(response, str):
+        return _parse_text(response)
     try:
-        if isinstance(response, str):
-            return json.loads(response)
-        elif hasattr(response, 'choices') and response.choices:
-            return json.loads(response.choices[0].message.content)
-    except json.JSONDecodeError:
+        content = response.choices[0].message.content
+    except (AttributeError, IndexError, TypeError):
         return None
+    return _parse_text(content) if isinstance(content, str) else None
+
+def _parse_text(text):
+    cleaned_response = text.strip()
+    # Most replies are bare JSON; decode those before looking for fences or surrounding text
+    if cleaned_response[:1] in ('{', '['):
+        try:
+            return orjson.loads(cleaned_response)
+        except json.JSONDecodeError:
+            pass
+    # Anything else needs a search. For short replies it is remembered, as those are the ones seen
+    # again (retries, replayed completions); long ones would pin large strings in the cache for
+    # little gain. Only the text is cached, so every call returns fresh objects
+    if len(cleaned_response) <= _CACHED_REPLY_MAX_CHARS:
+        json_text = _find_short_json_text(cleaned_response)
+    else:
+        json_text = _find_json_text(cleaned_response)
+    return _decoder.decode(json_text) if json_text is not None else None
+
+def _find_json_text(cleaned_response):
+    """Returns the part of the reply that decodes as JSON, or None."""
+    # Strip a surrounding markdown code fence, e.g. ```json ... ```
+    if cleaned_response.startswith('```'):
+        cleaned_response = cleaned_response[3:].removeprefix('json').removesuffix('```').strip()
+        try:
+            orjson.loads(cleaned_response)
+            return cleaned_response
+        except json.JSONDecodeError:
+            pass
+    # Otherwise try the span from the first '{' to the last '}', dropping any text around it
+    start = cleaned_response.find('{')
+    end = cleaned_response.rfind('}')
+    if start == -1 or end < start:
+        return None
+    try:
+        orjson.loads(cleaned_response[start:end + 1])
+        return cleaned_response[start:end + 1]
+    except json.JSONDecodeError:
+        return _extract_json(cleaned_response)[1]
+
+# Holds at most 256 replies of up to 4 KB each
+_CACHED_REPLY_MAX_CHARS = 4096
+_find_short_json_text = lru_cache(maxsize=256)(_find_json_text)
 
 def extract_json_from_text(text):
     """
     Attempt to extract a JSON object from a text string.
     """
-    # Try to find JSON-like structure in the text
-    json_match = re.search(r'\{(?:[^{}]|(?R))*\}', text)
-    if json_match:
+    return _extract_json(text)[0]
+
+def _extract_json(text):
+    """Returns the first JSON object in the text and the text it was decoded from, or (None, None)."""
+    # Try to decode a JSON object at each opening brace in turn; raw_decode does the
+    # balanced parsing in C and stops at the end of the object, ignoring trailing text
+    start = text.find('{')
+    while start != -1:
         try:
-            return json.loads(json_match.group(0))
+            obj, end = _decoder.raw_decode(text, start)
+            return obj, text[start:end]
         except json.JSONDecodeError:
-            return None
-    return None
+            start = text.find('{', start + 1)
+    return None, None
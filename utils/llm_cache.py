@@ -0,0 +1,166 @@
+# utils/llm_cache.py
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+import orjson
+from utils.logger import setup_logger
+
+logger = setup_logger('llm_cache', 'logs/llm_cache.log')
+
+LLM_CACHE_PATH = os.path.join('.llm_cache', 'completions.sqlite')
+SEMANTIC_CACHE_PATH = os.path.join('.llm_cache', 'semantic.sqlite')
+
+class LLMCache:
+    """
+    Exact-match, disk-backed cache of completion texts.
+
+    Entries are keyed on everything that determines the reply (model, messages, max_tokens,
+    temperature, ...) and the least recently used ones are dropped beyond max_entries.
+    """
+    def __init__(self, path=LLM_CACHE_PATH, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+        # Lookups answered from / missing in the cache, for reporting its hit rate
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(model, messages, **params):
+        # orjson serializes straight to bytes, and BLAKE2b hashes them faster than SHA-256
+        request = orjson.dumps({'model': model, 'messages': messages, **params}, option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.blake2b(request, digest_size=16).hexdigest()
+
+    def get(self, key):
+        try:
+            with self._lock:
+                conn = self._connection()
+                row = conn.execute("SELECT content FROM completions WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                conn.execute("UPDATE completions SET accessed = ? WHERE key = ?", (time.time(), key))
+                conn.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            logger.error(f"Error reading LLM cache: {e}")
+            return None
+
+    def set(self, key, content):
+        try:
+            with self._lock:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO completions (key, content, accessed) VALUES (?, ?, ?)",
+                    (key, content, time.time())
+                )
+                conn.execute(
+                    "DELETE FROM completions WHERE key NOT IN "
+                    "(SELECT key FROM completions ORDER BY accessed DESC LIMIT ?)",
+                    (self.max_entries,)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing LLM cache: {e}")
+
+    def _connection(self):
+        # Opened on first use, so importing the cache never touches the disk
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions (key TEXT PRIMARY KEY, content TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+        return self._conn
+
+class SemanticCache:
+    """
+    Near-duplicate cache of completion texts, matched on the embedding of the last message.
+
+    Only prompts in the same namespace (model, earlier messages, max_tokens, ...) are compared,
+    and a cached reply is returned when its prompt's cosine similarity reaches `threshold`.
+    `embed` turns a text into a vector, e.g. by calling an embeddings endpoint.
+    """
+    def __init__(self, embed, path=SEMANTIC_CACHE_PATH, threshold=0.92, max_entries=1000):
+        self.embed = embed
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+        # namespace -> (matrix of unit-length prompt embeddings, list of replies), loaded on first use
+        self._indexes = {}
+
+    def lookup(self, namespace, text):
+        """
+        Returns (cached reply or None, embedding of text). Pass the embedding to add() on a miss,
+        so the text is not embedded twice. Both are None if the text couldn't be embedded.
+        """
+        try:
+            vector = np.asarray(self.embed(text), dtype=np.float32)
+            vector /= np.linalg.norm(vector) or 1.0
+        except Exception as e:
+            logger.error(f"Error embedding prompt for semantic cache: {e}")
+            return None, None
+        with self._lock:
+            matrix, replies = self._index(namespace)
+            if replies:
+                similarities = matrix @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    return replies[best], vector
+        return None, vector
+
+    def add(self, namespace, vector, content):
+        try:
+            with self._lock:
+                matrix, replies = self._index(namespace)
+                # Oldest entries are dropped beyond max_entries
+                matrix = np.vstack([matrix, vector[None, :]]) if replies else vector[None, :]
+                matrix = matrix[-self.max_entries:]
+                replies = (replies + [content])[-self.max_entries:]
+                self._indexes[namespace] = (matrix, replies)
+                conn = self._connection()
+                conn.execute(
+                    "INSERT INTO prompts (namespace, embedding, content) VALUES (?, ?, ?)",
+                    (namespace, vector.tobytes(), content)
+                )
+                conn.execute(
+                    "DELETE FROM prompts WHERE namespace = ? AND rowid NOT IN "
+                    "(SELECT rowid FROM prompts WHERE namespace = ? ORDER BY rowid DESC LIMIT ?)",
+                    (namespace, namespace, self.max_entries)
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing semantic cache: {e}")
+
+    def _index(self, namespace):
+        if namespace not in self._indexes:
+            try:
+                rows = self._connection().execute(
+                    "SELECT embedding, content FROM prompts WHERE namespace = ? ORDER BY rowid", (namespace,)
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading semantic cache: {e}")
+                rows = []
+            if rows:
+                matrix = np.vstack([np.frombuffer(embedding, dtype=np.float32) for embedding, _ in rows])
+            else:
+                matrix = np.empty((0, 0), dtype=np.float32)
+            self._indexes[namespace] = (matrix, [content for _, content in rows])
+        return self._indexes[namespace]
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS prompts (namespace TEXT NOT NULL, embedding BLOB NOT NULL, content TEXT NOT NULL)"
+            )
+        return self._conn
@@ -2,36 +2,97 @@
 
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+
+# Formatters are stateless, so every logger's handlers share these two
+FILE_FORMATTER = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+CONSOLE_FORMATTER = logging.Formatter('%(name)s - %(levelname)s - %(message)s')
 
 def ensure_log_file(log_file):
     """Ensure that the log file and its directory exist."""
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
-    if not os.path.exists(log_file):
-        open(log_file, 'a').close()
+    # O_CREAT without O_TRUNC creates the file if needed and leaves an existing one untouched
+    os.close(os.open(log_file, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644))
+
+class _Dispatcher(QueueListener):
+    """
+    The one listener thread for every logger: passes each queued record on to the
+    handlers of the BackgroundHandler that queued it.
+    """
+    def handle(self, item):
+        if isinstance(item, threading.Event):
+            item.set()  # Everything queued before it has been handled
+            return
+        target, record = item
+        for handler in target.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+_listener = _Dispatcher(queue.SimpleQueue())
+_listener.start()
+
+class BackgroundHandler(QueueHandler):
+    """
+    Queues records for the shared listener thread, which passes them on to the given handlers,
+    so logging calls never wait on disk or console I/O. Closing it drains the queue.
+    """
+    def __init__(self, *handlers):
+        super().__init__(_listener.queue)
+        self.handlers = handlers
+        self._closed = False
+
+    def enqueue(self, record):
+        self.queue.put_nowait((self, record))
+
+    def close(self):
+        # Also called by logging.shutdown at exit, before the wrapped handlers are closed
+        if not self._closed:
+            self._closed = True
+            drained = threading.Event()
+            self.queue.put_nowait(drained)
+            drained.wait(timeout=5)  # Bounded, in case the listener thread is already gone at exit
+            for handler in self.handlers:
+                handler.close()
+        super().close()
+
+# Handler set up for each (logger name, log file), so repeat calls can return early
+_background_handlers = {}
 
 def setup_logger(name, log_file, level=logging.INFO, console_level=logging.WARNING, log_rotation=False):
     """Set up a logger with file and console handlers."""
+    # Components call this from their constructors; reuse the handlers from an earlier
+    # call instead of stacking another pair, which would write every record again
+    key = (name, os.path.abspath(log_file))
+    logger = logging.getLogger(name)
+    if _background_handlers.get(key) in logger.handlers:
+        logger.setLevel(level)
+        return logger
+
     # Create logs directory if it doesn't exist
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
     # Create a custom logger
-    logger = logging.getLogger(name)
     logger.setLevel(level)  # Set logger to level specified
 
     # Create handlers
     if log_rotation:
-        file_handler = RotatingFileHandler(log_file, maxBytes=1024*1024, backupCount=5)  # 1MB per file, keep 5 backups
+        file_handler = RotatingFileHandler(log_file, maxBytes=1024*1024, backupCount=5, delay=True)  # 1MB per file, keep 5 backups
     else:
-        file_handler = logging.FileHandler(log_file)
+        # Reopens the file if an external rotator (e.g. logrotate) moves it; opened on the first record
+        file_handler = WatchedFileHandler(log_file, delay=True)
     
     file_handler.setLevel(level)  # Set file handler to level specified
-    file_handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    logger.addHandler(file_handler)
+    file_handler.setFormatter(FILE_FORMATTER)
 
     console_handler = logging.StreamHandler()
     console_handler.setLevel(console_level)  # Keep console level as specified (default INFO)
-    console_handler.setFormatter(logging.Formatter('%(name)s - %(levelname)s - %(message)s'))
-    logger.addHandler(console_handler)
+    console_handler.setFormatter(CONSOLE_FORMATTER)
+
+    # Both are written to from a background thread; the logger only enqueues records
+    background_handler = BackgroundHandler(file_handler, console_handler)
+    logger.addHandler(background_handler)
+    _background_handlers[key] = background_handler
 
     return logger
@@ -1,57 +1,102 @@
-from typing import Dict, List, Tuple
+from enum import IntEnum
+from typing import Dict, List, Tuple, Union
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the numeric core runs as plain NumPy without it
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+class Metric(IntEnum):
+    """Position of each metric in PerformanceMetrics' backing array."""
+    IDEA_QUALITY = 0
+    IDEA_EVALUATION_EFFECTIVENESS = 1
+    EXPERIMENT_DESIGN_QUALITY = 2
+    EXPERIMENT_EXECUTION_EFFICIENCY = 3
+    RESEARCH_APPLICATION_CREATIVITY = 4
+    SYSTEM_RELIABILITY = 5
+    CODING_TASK_PERFORMANCE = 6
+    REPORT_QUALITY = 7
+    LOG_ERROR_CHECKING_ACCURACY = 8
+    ERROR_FIXING_EFFECTIVENESS = 9
+
+METRIC_NAMES = tuple(metric.name.lower() for metric in Metric)
+_METRIC_INDEX = {name: index for index, name in enumerate(METRIC_NAMES)}
+
+METRIC_WEIGHTS = {
+    'idea_quality': 0.15,
+    'idea_evaluation_effectiveness': 0.1,
+    'experiment_design_quality': 0.15,
+    'experiment_execution_efficiency': 0.1,
+    'research_application_creativity': 0.1,
+    'system_reliability': 0.1,
+    'coding_task_performance': 0.1,
+    'report_quality': 0.05,
+    'log_error_checking_accuracy': 0.05,
+    'error_fixing_effectiveness': 0.1
+}
+_WEIGHTS = np.array([METRIC_WEIGHTS[metric] for metric in METRIC_NAMES], dtype=np.float64)
+
+@njit(cache=True, fastmath=True)
+def _weighted_score(values, weights):
+    return (values * weights).sum()
+
+@njit(cache=True, fastmath=True)
+def _improvement_percentages(previous, current):
+    # Metrics that were 0 count as a full improvement if they became positive at all
+    safe_previous = np.where(previous != 0, previous, 1.0)
+    relative = (current - previous) / safe_previous * 100.0
+    from_zero = np.where(current > 0, 100.0, 0.0)
+    return np.where(previous != 0, relative, from_zero)
+
+_jit_warmed_up = False
+
+def _warm_up_jit():
+    """Compile (or load from cache) the numeric core once, so no benchmark run pays for it."""
+    global _jit_warmed_up
+    if not _jit_warmed_up:
+        _weighted_score(_WEIGHTS, _WEIGHTS)
+        _improvement_percentages(_WEIGHTS, _WEIGHTS)
+        _jit_warmed_up = True
 
 class PerformanceMetrics:
     def __init__(self):
-        self.metrics = {
-            'idea_quality': 0.0,
-            'idea_evaluation_effectiveness': 0.0,
-            'experiment_design_quality': 0.0,
-            'experiment_execution_efficiency': 0.0,
-            'research_application_creativity': 0.0,
-            'system_reliability': 0.0,
-            'coding_task_performance': 0.0,
-            'report_quality': 0.0,
-            'log_error_checking_accuracy': 0.0,
-            'error_fixing_effectiveness': 0.0
-        }
-
-    def update(self, metric: str, value: float):
-        if metric in self.metrics:
-            self.metrics[metric] = value
+        _warm_up_jit()
+        self._values = np.zeros(len(Metric), dtype=np.float64)
+
+    def update(self, metric: Union[Metric, str], value: float):
+        if isinstance(metric, Metric):
+            self._values[metric] = value
+        elif metric in _METRIC_INDEX:
+            self._values[_METRIC_INDEX[metric]] = value
         else:
             raise ValueError(f"Invalid metric: {metric}")
 
+    def values(self) -> np.ndarray:
+        """Metric values ordered by Metric."""
+        return self._values.copy()
+
     def get_all(self) -> Dict[str, float]:
-        return self.metrics.copy()
+        return dict(zip(METRIC_NAMES, self._values.tolist()))
+
+    def overall_score(self) -> float:
+        return float(_weighted_score(self._values, _WEIGHTS))
 
 def evaluate_system_performance(previous_metrics: Dict[str, float], current_metrics: Dict[str, float]) -> Tuple[bool, Dict[str, float], List[str]]:
-    improvements = []
-    improvement_percentages = {}
-    improved_metrics = []
-
-    for metric, current_value in current_metrics.items():
-        if metric in previous_metrics:
-            previous_value = previous_metrics[metric]
-            if previous_value != 0:
-                improvement_percentage = ((current_value - previous_value) / previous_value) * 100
-            else:
-                improvement_percentage = 100 if current_value > 0 else 0
-            
-            improvement_percentages[metric] = improvement_percentage
-            
-            if current_value > previous_value:
-                improvements.append(1)
-                improved_metrics.append(metric)
-            elif current_value < previous_value:
-                improvements.append(-1)
-            else:
-                improvements.append(0)
-        else:
-            improvements.append(1)
-            improvement_percentages[metric] = 100
-            improved_metrics.append(metric)
+    metrics = list(current_metrics)
+    has_previous = np.array([metric in previous_metrics for metric in metrics], dtype=bool)
+    previous = np.array([previous_metrics.get(metric, 0.0) for metric in metrics], dtype=np.float64)
+    current = np.array([current_metrics[metric] for metric in metrics], dtype=np.float64)
 
-    overall_improvement = sum(improvements) > 0
+    # Metrics without a previous value count as fully improved
+    percentages = np.where(has_previous, _improvement_percentages(previous, current), 100.0)
+    improved = ~has_previous | (current > previous)
+    improvements = int(np.where(has_previous, np.sign(current - previous), 1.0).sum())
+
+    improvement_percentages = dict(zip(metrics, percentages.tolist()))
+    improved_metrics = [metrics[i] for i in np.flatnonzero(improved)]
+    overall_improvement = improvements > 0
 
     return overall_improvement, improvement_percentages, improved_metrics
 
@@ -82,37 +127,22 @@ def generate_performance_report(previous_metrics: Dict[str, float], current_metr
     overall_improvement, improvement_percentages, improved_metrics = evaluate_system_performance(previous_metrics, current_metrics)
     analysis = analyze_performance_changes(improvement_percentages)
 
-    report = "Performance Evaluation Report\n"
-    report += "============================\n\n"
+    parts = ["Performance Evaluation Report\n", "============================\n\n"]
 
-    report += f"Overall Improvement: {'Yes' if overall_improvement else 'No'}\n\n"
+    parts.append(f"Overall Improvement: {'Yes' if overall_improvement else 'No'}\n\n")
 
-    report += "Metric Changes:\n"
+    parts.append("Metric Changes:\n")
     for metric, percentage in improvement_percentages.items():
-        report += f"  {metric}: {percentage:.2f}%\n"
+        parts.append(f"  {metric}: {percentage:.2f}%\n")
 
-    report += "\nAnalysis:\n"
+    parts.append("\nAnalysis:\n")
     for category, metrics in analysis.items():
         if metrics:
-            report += f"  {category.replace('_', ' ').title()}:\n"
-            for metric in metrics:
-                report += f"    - {metric}\n"
+            parts.append(f"  {category.replace('_', ' ').title()}:\n")
+            parts.extend(f"    - {metric}\n" for metric in metrics)
 
-    return report
+    return "".join(parts)
 
 def calculate_overall_performance_score(metrics: Dict[str, float]) -> float:
-    weights = {
-        'idea_quality': 0.15,
-        'idea_evaluation_effectiveness': 0.1,
-        'experiment_design_quality': 0.15,
-        'experiment_execution_efficiency': 0.1,
-        'research_application_creativity': 0.1,
-        'system_reliability': 0.1,
-        'coding_task_performance': 0.1,
-        'report_quality': 0.05,
-        'log_error_checking_accuracy': 0.05,
-        'error_fixing_effectiveness': 0.1
-    }
-
-    score = sum(metrics[metric] * weight for metric, weight in weights.items())
-    return score
+    values = np.array([metrics[metric] for metric in METRIC_NAMES], dtype=np.float64)
+    return float(_weighted_score(values, _WEIGHTS))
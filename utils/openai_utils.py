@@ -1,41 +1,579 @@
 # utils/openai_utils.py
 
 import openai
+import asyncio
+import atexit
+import concurrent.futures
+from functools import lru_cache
+import importlib.util
 import logging
+import orjson
+import os
+import threading
 import time
 import traceback
-from tenacity import retry, stop_after_attempt, wait_random_exponential
+from tenacity import before_sleep_log, retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 from utils.logger import setup_logger
+from utils.config import GRADER_BASE_URL, OPENAI_ENDPOINTS, RATE_LIMIT_RPM, RATE_LIMIT_TPM, LLM_CACHE, SEMANTIC_CACHE, EMBEDDING_MODEL
+from utils.llm_cache import LLMCache, SemanticCache
+from utils.constants import context_window
 
 # Setup a logger for openai_utils
 logger = setup_logger('openai_utils', 'logs/openai_utils.log')
 
-# Initialize the OpenAI client
-client = openai.OpenAI()
+# HTTP/2 needs the optional h2 package; without it the pool falls back to HTTP/1.1 keep-alive
+HTTP2_ENABLED = importlib.util.find_spec('h2') is not None
+# tiktoken is optional too; without it requests are sent without a token check. It is only
+# imported when the first prompt is counted, which keeps it out of every component's startup
+TIKTOKEN_AVAILABLE = importlib.util.find_spec('tiktoken') is not None
+
+# Initialize the OpenAI clients
+# One module-level connection pool, so every create_completion call reuses its connections; with
+# HTTP/2 concurrent requests to an endpoint are multiplexed over a single one
+_http_client = openai.DefaultHttpxClient(http2=HTTP2_ENABLED)
+atexit.register(_http_client.close)
+client = openai.OpenAI(http_client=_http_client)
+# Grading calls are short; give up on them after a minute, but on unreachable endpoints within seconds
+ASYNC_TIMEOUT = openai.Timeout(60.0, connect=5.0)
+# All async clients share one connection pool, driven by one long-lived event loop (see run_async),
+# so connections and their TLS sessions are reused across benchmark runs and retries
+_async_http_client = openai.DefaultAsyncHttpxClient(http2=HTTP2_ENABLED)
+async_client = openai.AsyncOpenAI(http_client=_async_http_client, timeout=ASYNC_TIMEOUT)
+# Benchmark grading may be served by a separate endpoint
+grader_async_client = (
+    openai.AsyncOpenAI(base_url=GRADER_BASE_URL, http_client=_async_http_client, timeout=ASYNC_TIMEOUT)
+    if GRADER_BASE_URL else async_client
+)
+_event_loop = asyncio.new_event_loop()
+
+llm_cache = LLMCache()
+
+def _cache_key(temperature, model, messages, **params):
+    # Sampled completions are only replayed when LLM_CACHE is set
+    if temperature == 0 or LLM_CACHE:
+        return LLMCache.key(model, messages, temperature=temperature, **params)
+    return None
+
+def _embed(text):
+    return client.embeddings.create(model=EMBEDDING_MODEL, input=text).data[0].embedding
+
+semantic_cache = SemanticCache(_embed)
+
+def _semantic_namespace(temperature, model, messages, **params):
+    # Answers that are meant to vary are never shared between paraphrases
+    if SEMANTIC_CACHE and temperature <= 0.3 and messages and isinstance(messages[-1].get('content'), str):
+        return LLMCache.key(model, messages[:-1], embedding_model=EMBEDDING_MODEL, **params)
+    return None
+
+def run_async(coro):
+    """
+    Runs a coroutine to completion on the shared event loop. Use this instead of asyncio.run(),
+    which closes its loop and with it every pooled connection opened on that loop.
+    """
+    return _event_loop.run_until_complete(coro)
+
+@atexit.register
+def _close_async_clients():
+    if not _event_loop.is_closed():
+        _event_loop.run_until_complete(_async_http_client.aclose())
+        _event_loop.run_until_complete(_event_loop.shutdown_default_executor())
+        _event_loop.close()
+
+# Errors worth retrying; anything else (bad request, auth, ...) fails the same way again
+TRANSIENT_ERRORS = (
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+_backoff = wait_random_exponential(min=1, max=60)
+
+def _retry_after(error):
+    """Seconds a rate-limited response asks to wait (at most 60), or None."""
+    response = getattr(error, 'response', None)
+    if isinstance(error, openai.RateLimitError) and response is not None:
+        try:
+            if 'retry-after-ms' in response.headers:
+                return min(float(response.headers['retry-after-ms']) / 1000, 60)
+            if 'retry-after' in response.headers:
+                return min(float(response.headers['retry-after']), 60)
+        except ValueError:
+            pass  # Retry-After may also be an HTTP date
+    return None
+
+def wait_for_rate_limit(retry_state):
+    """
+    Waits as long as a rate-limited response's Retry-After header asks, at most 60 seconds.
+    Other errors, and 429s without a usable header, back off exponentially with full jitter.
+    """
+    wait = _retry_after(retry_state.outcome.exception())
+    return wait if wait is not None else _backoff(retry_state)
+
+# Only transient errors are retried. Jittered backoff keeps callers that hit a rate limit
+# together from all retrying at the same moment, unless the server says when to retry
+retry_transient = retry(
+    stop=stop_after_attempt(6),
+    wait=wait_for_rate_limit,
+    retry=retry_if_exception_type(TRANSIENT_ERRORS),
+    before_sleep=before_sleep_log(logger, logging.WARNING),
+)
+
+class CircuitOpenError(Exception):
+    pass
+
+class TokenBudgetError(ValueError):
+    pass
+
+@lru_cache(maxsize=None)
+def _encoding(model):
+    """The model's tiktoken encoding, or None if it can't be loaded; either is remembered per model."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('cl100k_base')
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails offline or behind some proxies
+        logger.warning(f"Couldn't load a tiktoken encoding for {model}, sending requests without a token check: {e!r}")
+        return None
+
+def count_tokens(model, messages):
+    """Prompt tokens of a chat request, or None if tiktoken isn't installed or its encoding can't be loaded."""
+    encoding = _encoding(model) if TIKTOKEN_AVAILABLE else None
+    if encoding is None:
+        return None
+    # Each message carries a few tokens of framing, and the reply is primed with 3 more
+    return sum(4 + len(encoding.encode(str(message.get('content') or ''))) for message in messages) + 3
+
+def fit_max_tokens(model, messages, max_tokens, margin=16):
+    """
+    Lowers max_tokens so prompt and completion fit in the model's context window. Raises
+    TokenBudgetError if the prompt alone doesn't fit, rather than sending a request the API rejects.
+    """
+    window = context_window(model)
+    prompt_tokens = count_tokens(model, messages) if window else None
+    if prompt_tokens is None:
+        return max_tokens
+    available = window - prompt_tokens - margin
+    if available <= 0:
+        raise TokenBudgetError(f"Prompt of {prompt_tokens} tokens doesn't fit {model}'s {window}-token context window")
+    if available < max_tokens:
+        logger.warning(f"Lowering max_tokens from {max_tokens} to {available} to fit {model}'s context window")
+        return available
+    return max_tokens
+
+class TokenBucket:
+    """
+    Refills at `rate` tokens per second up to `capacity`. A caller taking more than is left
+    goes into debt and waits it out, so callers after it wait their turn behind it.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, n):
+        """Takes n tokens and returns how many seconds to wait before using them."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self.tokens -= n
+            return -self.tokens / self.rate if self.tokens < 0 else 0.0
+
+    def take(self, n):
+        wait = self.reserve(n)
+        if wait:
+            time.sleep(wait)
+
+# Only set up when RATE_LIMIT_RPM / RATE_LIMIT_TPM are set; each allows a minute's worth in a burst
+request_bucket = TokenBucket(RATE_LIMIT_RPM / 60, RATE_LIMIT_RPM) if RATE_LIMIT_RPM else None
+token_bucket = TokenBucket(RATE_LIMIT_TPM / 60, RATE_LIMIT_TPM) if RATE_LIMIT_TPM else None
+
+def _rate_limit_wait(model, messages, max_tokens):
+    """Reserves one request and its worst-case tokens, returning the seconds to wait before sending."""
+    wait = request_bucket.reserve(1) if request_bucket else 0.0
+    if token_bucket:
+        # The API counts max_tokens against the limit up front; without tiktoken, ~4 characters a token
+        prompt_tokens = count_tokens(model, messages)
+        if prompt_tokens is None:
+            prompt_tokens = sum(len(str(message.get('content') or '')) for message in messages) // 4
+        wait = max(wait, token_bucket.reserve(prompt_tokens + max_tokens))
+    return wait
+
+class CircuitBreaker:
+    """
+    Fails fast once an endpoint has failed `failure_threshold` times in a row within `window` seconds,
+    then lets a trial call through after `reset_timeout` seconds.
+    """
+    def __init__(self, failure_threshold=5, window=60, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self._failures = []
+        self._opened_at = None
+
+    def check(self):
+        if self._opened_at is None:
+            return
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            raise CircuitOpenError(f"Circuit open after {self.failure_threshold} consecutive failures")
+        self._opened_at = None  # Half-open: allow a trial call
+
+    def record_success(self):
+        self._failures.clear()
+        self._opened_at = None
+
+    def record_failure(self):
+        now = time.monotonic()
+        self._failures = [t for t in self._failures if now - t < self.window]
+        self._failures.append(now)
+        if len(self._failures) >= self.failure_threshold:
+            self._opened_at = now
+            logger.warning(f"Circuit breaker opened for {self.reset_timeout}s")
+
+class ClientPool:
+    """
+    Spreads requests round-robin over clients for several endpoints. A client whose endpoint
+    returned a transient error is skipped until its cool-down ends, so retries go elsewhere.
+    """
+    def __init__(self, clients, cool_down=5):
+        self.clients = clients
+        self.cool_down = cool_down
+        self._available_at = [0.0] * len(clients)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            now = time.monotonic()
+            for offset in range(len(self.clients)):
+                index = (self._next + offset) % len(self.clients)
+                if self._available_at[index] <= now:
+                    self._next = index + 1
+                    return self.clients[index]
+            # Every endpoint is cooling down; use the one that recovers first
+            return self.clients[min(range(len(self.clients)), key=self._available_at.__getitem__)]
+
+    def record_failure(self, client, error):
+        wait = _retry_after(error)
+        with self._lock:
+            index = self.clients.index(client)
+            self._available_at[index] = time.monotonic() + (wait if wait is not None else self.cool_down)
+
+# Only set up when OPENAI_ENDPOINTS lists endpoints; otherwise requests go to client / async_client
+client_pool = ClientPool([
+    openai.OpenAI(base_url=endpoint.get('base_url'), api_key=endpoint.get('api_key'), http_client=_http_client)
+    for endpoint in OPENAI_ENDPOINTS
+]) if OPENAI_ENDPOINTS else None
+async_client_pool = ClientPool([
+    openai.AsyncOpenAI(base_url=endpoint.get('base_url'), api_key=endpoint.get('api_key'),
+                       http_client=_async_http_client, timeout=ASYNC_TIMEOUT)
+    for endpoint in OPENAI_ENDPOINTS
+]) if OPENAI_ENDPOINTS else None
+
+def response_content(response):
+    """Text of a chat completion's first choice, or None if it has no choices."""
+    choices = response.choices
+    return choices[0].message.content if choices else None
 
 def log_api_call(model, prompt, response):
-    logger.info(f"API Call - Model: {model}")
-    logger.info(f"Prompt: {prompt[:100]}...")  # Log first 100 characters of prompt
-    logger.info(f"Response: {response[:100]}...")  # Log first 100 characters of response
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    # For a message list, preview the last message rather than stringifying the whole conversation
+    if isinstance(prompt, list):
+        prompt = prompt[-1].get('content', '') if prompt else ''
+    logger.info("API Call - Model: %s", model)
+    logger.info("Prompt: %s...", str(prompt)[:100])  # Log first 100 characters of prompt
+    logger.info("Response: %s...", response[:100])  # Log first 100 characters of response
+
+# Requests that can be answered from the cache are also shared while in flight: concurrent
+# identical calls wait for the first one instead of sending their own
+_inflight = {}
+_inflight_lock = threading.Lock()
+_inflight_tasks = {}
+
+def normalize_messages(messages):
+    """
+    Moves system content to the front, merged into one message, and drops fields set to None.
+    OpenAI caches prompts by exact prefix, so requests sharing instructions then share a prefix.
+    """
+    system = [message for message in messages if message.get('role') == 'system']
+    others = [message for message in messages if message.get('role') != 'system']
+    if len(system) > 1:
+        system = [{'role': 'system', 'content': '\n\n'.join(str(message['content']) for message in system)}]
+    return [{key: value for key, value in message.items() if value is not None} for message in system + others]
 
-@retry(stop=stop_after_attempt(3), wait=wait_random_exponential(min=1, max=60))
 def create_completion(model, messages, max_tokens=4000, temperature=0.7):
+    messages = normalize_messages(messages)
+    max_tokens = fit_max_tokens(model, messages, max_tokens)
+    cache_key = _cache_key(temperature, model, messages, max_tokens=max_tokens)
+    if cache_key is None:
+        return _create_completion(model, messages, max_tokens, temperature, cache_key)
+    with _inflight_lock:
+        future = _inflight.get(cache_key)
+        is_owner = future is None
+        if is_owner:
+            future = _inflight[cache_key] = concurrent.futures.Future()
+    if not is_owner:
+        return future.result()
+    try:
+        content = _create_completion(model, messages, max_tokens, temperature, cache_key)
+        future.set_result(content)
+        return content
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[cache_key]
+
+@retry_transient
+def _create_completion(model, messages, max_tokens, temperature, cache_key):
+    if cache_key:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit - Model: {model} ({llm_cache.hits} hits, {llm_cache.misses} misses so far)")
+            return cached
+    namespace = _semantic_namespace(temperature, model, messages, max_tokens=max_tokens)
+    vector = None
+    if namespace:
+        cached, vector = semantic_cache.lookup(namespace, messages[-1]['content'])
+        if cached is not None:
+            logger.info(f"Semantic cache hit - Model: {model}")
+            return cached
+    wait = _rate_limit_wait(model, messages, max_tokens)
+    if wait:
+        time.sleep(wait)
+    request_client = client_pool.get() if client_pool else client
     try:
-        response = client.chat.completions.create(
+        response = request_client.chat.completions.create(
             model=model,
             messages=messages,
             max_tokens=max_tokens,
             temperature=temperature,
         )
-        content = response.choices[0].message.content if response.choices else None
+        content = response_content(response)
         if content:
-            log_api_call(model, str(messages), content)  # Log the API call
+            log_api_call(model, messages, content)  # Log the API call
+            if cache_key:
+                llm_cache.set(cache_key, content)
+            if vector is not None:
+                semantic_cache.add(namespace, vector, content)
         return content
     except Exception as e:
+        if client_pool and isinstance(e, TRANSIENT_ERRORS):
+            client_pool.record_failure(request_client, e)
         logger.error(f"Error in create_completion: {str(e)}")
         logger.error(f"Traceback: {traceback.format_exc()}")
         raise
 
+@retry_transient
+def _open_completion_stream(model, messages, max_tokens, temperature):
+    wait = _rate_limit_wait(model, messages, max_tokens)
+    if wait:
+        time.sleep(wait)
+    request_client = client_pool.get() if client_pool else client
+    try:
+        return request_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            stream=True,
+        )
+    except TRANSIENT_ERRORS as e:
+        if client_pool:
+            client_pool.record_failure(request_client, e)
+        raise
+
+def create_completion_stream(model, messages, max_tokens=4000, temperature=0.7):
+    """
+    Streaming counterpart of create_completion: yields the reply text in pieces as they arrive.
+    Only opening the stream is retried, so a failure part-way through is raised rather than
+    paying for the completion twice. ''.join() the pieces for the full reply.
+    """
+    messages = normalize_messages(messages)
+    max_tokens = fit_max_tokens(model, messages, max_tokens)
+    cache_key = _cache_key(temperature, model, messages, max_tokens=max_tokens)
+    if cache_key:
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit - Model: {model} ({llm_cache.hits} hits, {llm_cache.misses} misses so far)")
+            yield cached
+            return
+    try:
+        parts = []
+        for chunk in _open_completion_stream(model, messages, max_tokens, temperature):
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                parts.append(delta)
+                yield delta
+    except Exception as e:
+        logger.error(f"Error in create_completion_stream: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise
+    content = ''.join(parts)
+    if content:
+        log_api_call(model, messages, content)  # Log the API call
+        if cache_key:
+            llm_cache.set(cache_key, content)
+
+async def acreate_completion(model, messages, max_tokens=4000, temperature=0.7, client=None, response_format=None):
+    """
+    Async counterpart of create_completion, for fanning out independent calls concurrently.
+    Pass `client` to send the request to an endpoint other than the default one.
+    Retries the same transient errors as create_completion.
+    """
+    messages = normalize_messages(messages)
+    max_tokens = fit_max_tokens(model, messages, max_tokens)
+    cache_key = _cache_key(temperature, model, messages, max_tokens=max_tokens, response_format=response_format,
+                           base_url=str((client or async_client).base_url))
+    if cache_key is None:
+        return await _acreate_completion(model, messages, max_tokens, temperature, client, response_format, cache_key)
+    task = _inflight_tasks.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(
+            _acreate_completion(model, messages, max_tokens, temperature, client, response_format, cache_key)
+        )
+        _inflight_tasks[cache_key] = task
+        task.add_done_callback(lambda _: _inflight_tasks.pop(cache_key, None))
+    # Shielded, so one caller being cancelled doesn't cancel the request for the others
+    return await asyncio.shield(task)
+
+@retry_transient
+async def _acreate_completion(model, messages, max_tokens, temperature, client, response_format, cache_key):
+    if cache_key:
+        cached = await asyncio.to_thread(llm_cache.get, cache_key)
+        if cached is not None:
+            logger.info(f"Cache hit - Model: {model} ({llm_cache.hits} hits, {llm_cache.misses} misses so far)")
+            return cached
+    # A client of its own (e.g. a local grader server) is not under this account's limits;
+    # grader_async_client is async_client itself unless GRADER_BASE_URL is set
+    if client is None or client is async_client:
+        wait = _rate_limit_wait(model, messages, max_tokens)
+        if wait:
+            await asyncio.sleep(wait)
+    request_client = client or (async_client_pool.get() if async_client_pool else async_client)
+    try:
+        extra_args = {'response_format': response_format} if response_format else {}
+        response = await request_client.chat.completions.create(
+            model=model,
+            messages=messages,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            **extra_args,
+        )
+        content = response_content(response)
+        if content:
+            log_api_call(model, messages, content)  # Log the API call
+            if cache_key:
+                await asyncio.to_thread(llm_cache.set, cache_key, content)
+        return content
+    except Exception as e:
+        if async_client_pool and request_client in async_client_pool.clients and isinstance(e, TRANSIENT_ERRORS):
+            async_client_pool.record_failure(request_client, e)
+        logger.error(f"Error in acreate_completion: {str(e)}")
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        raise
+
+def create_completions_batch(model, messages_list, max_tokens=4000, temperature=0.7, concurrency=20):
+    """
+    Runs independent completions concurrently, at most `concurrency` at a time, and returns
+    their contents in the order of messages_list. A request that still fails after
+    acreate_completion's retries yields None instead of failing the whole batch.
+    """
+    async def run_batch():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def complete(messages):
+            async with semaphore:
+                return await acreate_completion(model, messages, max_tokens=max_tokens, temperature=temperature)
+
+        results = await asyncio.gather(*(complete(messages) for messages in messages_list), return_exceptions=True)
+        return [None if isinstance(result, BaseException) else result for result in results]
+
+    return run_async(run_batch())
+
+def run_with_checkpoint(tasks, output_jsonl):
+    """
+    Runs create_completion for each task ({'id': ..., 'args': {create_completion arguments}}) and
+    appends every result to output_jsonl as soon as it arrives. Run again after a crash, it skips
+    the ids already in the file, so finished requests are neither lost nor paid for twice.
+    Returns {id: content} for all tasks in the file, old and new.
+    """
+    results = {}
+    if os.path.exists(output_jsonl):
+        with open(output_jsonl, 'rb+') as f:
+            data = f.read()
+            complete = data.rfind(b'\n') + 1
+            if complete < len(data):
+                # A line cut short by the crash; drop it so new lines don't get appended to it,
+                # and that task runs again
+                f.truncate(complete)
+            for line in data[:complete].splitlines():
+                try:
+                    record = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    continue
+                results[record['id']] = record['content']
+    with open(output_jsonl, 'ab') as f:
+        for task in tasks:
+            if task['id'] in results:
+                continue
+            content = create_completion(**task['args'])
+            f.write(orjson.dumps({'id': task['id'], 'content': content}) + b'\n')
+            f.flush()
+            results[task['id']] = content
+    return results
+
+# Batch statuses after which a batch job makes no further progress
+BATCH_FINAL_STATUSES = ('completed', 'failed', 'expired', 'cancelled')
+
+def create_completion_batch_job(model, messages_list, max_tokens=4000, temperature=0.7,
+                                poll_interval=30, completion_window='24h'):
+    """
+    Runs completions through the OpenAI Batch API, which costs half as much per token but
+    may take up to completion_window. Blocks until the batch ends and returns the contents
+    in the order of messages_list; requests without a successful result yield None.
+    Only use it for offline work such as evaluation runs.
+    """
+    requests_jsonl = b''.join(
+        orjson.dumps({
+            'custom_id': f'req-{i}',
+            'method': 'POST',
+            'url': '/v1/chat/completions',
+            'body': {'model': model, 'messages': messages, 'max_tokens': max_tokens, 'temperature': temperature},
+        }) + b'\n'
+        for i, messages in enumerate(messages_list)
+    )
+    input_file = client.files.create(file=('batch_requests.jsonl', requests_jsonl), purpose='batch')
+    batch = client.batches.create(input_file_id=input_file.id, endpoint='/v1/chat/completions',
+                                  completion_window=completion_window)
+    logger.info(f"Submitted batch {batch.id} with {len(messages_list)} requests - Model: {model}")
+
+    while batch.status not in BATCH_FINAL_STATUSES:
+        time.sleep(poll_interval)
+        batch = client.batches.retrieve(batch.id)
+    if batch.status != 'completed':
+        logger.error(f"Batch {batch.id} ended with status {batch.status}")
+
+    contents = [None] * len(messages_list)
+    # Expired and cancelled batches may still have results for some of their requests
+    if batch.output_file_id:
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            result = orjson.loads(line)
+            response = result.get('response') or {}
+            if response.get('status_code') == 200:
+                choices = response['body'].get('choices')
+                contents[int(result['custom_id'].removeprefix('req-'))] = choices[0]['message']['content'] if choices else None
+    logger.info(f"Batch {batch.id} returned {sum(content is not None for content in contents)}/{len(contents)} completions")
+    return contents
+
 def handle_api_error(func):
     def wrapper(*args, **kwargs):
         try: